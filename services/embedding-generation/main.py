@@ -2,20 +2,27 @@
 Embedding Generation Cloud Function
 
 GCP Cloud Function to generate embeddings for document chunks and store them in the database.
-Triggered by Pub/Sub (on chunk creation) or Cloud Scheduler.
+HTTP-triggered by Cloud Scheduler; each invocation drains all pending chunks.
 """
 
+from __future__ import annotations
+
+import hashlib
+import importlib
 import os
 import json
 import logging
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List
-from supabase import create_client, Client
-import numpy as np
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 
 from src.factory.embedding_service_factory import EmbeddingServiceFactory
 from src.interfaces.embedding_service import EmbeddingService
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,12 +34,28 @@ OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 EMBEDDING_PROVIDER = os.environ.get('EMBEDDING_PROVIDER', 'openai')
 EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'text-embedding-3-small')
 BATCH_SIZE = int(os.environ.get('BATCH_SIZE', '100'))  # Process chunks in batches
+WRITE_WORKERS = int(os.environ.get('WRITE_WORKERS', '4'))  # Concurrent batch writers
+MAX_PENDING_WRITES = WRITE_WORKERS * 2  # Bound embeddings held in memory awaiting write
+FETCH_BATCHES = int(os.environ.get('FETCH_BATCHES', '10'))  # Batches fetched per page
+MAX_RUNTIME_SECONDS = int(os.environ.get('MAX_RUNTIME_SECONDS', '480'))  # Stop before the 540s timeout
+
+# Heavy dependencies are imported on first use to keep cold-start imports minimal
+_np = None
+
+
+def _get_np():
+    """Import numpy on first use."""
+    global _np
+    if _np is None:
+        _np = importlib.import_module('numpy')
+    return _np
 
 
 def get_supabase_client() -> Client:
     """Get Supabase client."""
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError("Supabase URL and key must be set")
+    from supabase import create_client
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
@@ -47,18 +70,26 @@ def get_embedding_service() -> EmbeddingService:
     return EmbeddingServiceFactory.create(EMBEDDING_PROVIDER, config)
 
 
-def get_pending_chunks(supabase: Client, limit: int = None) -> List[Dict[str, Any]]:
+def get_pending_chunks(
+    supabase: Client,
+    limit: int = None,
+    after_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
-    Get chunks that need embeddings (status = 'pending').
+    Get chunks that need embeddings (status = 'pending'), in id order.
     
     Args:
         supabase: Supabase client
         limit: Maximum number of chunks to retrieve (None for all)
+        after_id: Only return chunks with an id greater than this (page cursor)
         
     Returns:
         List of chunk records
     """
-    query = supabase.table('document_chunks').select('*').eq('status', 'pending')
+    query = supabase.table('document_chunks').select('*').eq('status', 'pending').order('id')
+    
+    if after_id:
+        query = query.gt('id', after_id)
     
     if limit:
         query = query.limit(limit)
@@ -67,6 +98,22 @@ def get_pending_chunks(supabase: Client, limit: int = None) -> List[Dict[str, An
     return result.data if result.data else []
 
 
+def to_halfvec_literal(embedding: List[float]) -> str:
+    """
+    Format an embedding as a pgvector literal for a halfvec column.
+    
+    Rounding to FP16 first matches the stored precision and gives a much
+    shorter string, roughly halving the write payload.
+    """
+    np = _get_np()
+    return '[' + ','.join(map(str, np.asarray(embedding, dtype=np.float16))) + ']'
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of chunk content (embedding_cache key)."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
 def update_chunk_embedding(
     supabase: Client,
     chunk_id: str,
@@ -79,15 +126,11 @@ def update_chunk_embedding(
     Args:
         supabase: Supabase client
         chunk_id: Chunk ID
-        embedding: Embedding vector
+        embedding: Embedding vector (stored as FP16 halfvec)
         status: New status ('completed' or 'failed')
     """
-    # Convert embedding to string format for pgvector
-    # pgvector expects format: '[0.1,0.2,0.3,...]'
-    embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-    
     update_data = {
-        'embedding': embedding_str,
+        'embedding': to_halfvec_literal(embedding),
         'status': status,
         'processed_at': datetime.utcnow().isoformat(),
     }
@@ -95,24 +138,134 @@ def update_chunk_embedding(
     supabase.table('document_chunks').update(update_data).eq('id', chunk_id).execute()
 
 
+def mark_chunks_failed(supabase: Client, chunk_ids: List[str]) -> None:
+    """
+    Mark chunks as failed with a single update request.
+    
+    Args:
+        supabase: Supabase client
+        chunk_ids: Chunk IDs to mark as failed
+    """
+    if not chunk_ids:
+        return
+    
+    update_data = {
+        'status': 'failed',
+        'processed_at': datetime.utcnow().isoformat(),
+    }
+    
+    supabase.table('document_chunks').update(update_data).in_('id', chunk_ids).execute()
+
+
+def cache_embeddings(
+    supabase: Client,
+    texts: List[str],
+    embeddings: List[List[float]]
+) -> None:
+    """
+    Store embeddings in embedding_cache so identical content is not re-embedded.
+    
+    Args:
+        supabase: Supabase client
+        texts: Embedded texts
+        embeddings: Embedding vectors (same order as texts)
+    """
+    # One row per distinct content (a batch may repeat identical chunks)
+    rows = {}
+    for text, embedding in zip(texts, embeddings):
+        sha = content_hash(text)
+        if sha not in rows:
+            rows[sha] = {
+                'content_sha256': sha,
+                'model': EMBEDDING_MODEL,
+                'embedding': to_halfvec_literal(embedding),
+            }
+    
+    try:
+        supabase.table('embedding_cache').upsert(
+            list(rows.values()),
+            on_conflict='content_sha256,model',
+            ignore_duplicates=True
+        ).execute()
+    except Exception as e:
+        # The cache is an optimization; chunk embeddings are already written
+        logger.warning(f"Failed to update embedding cache: {e}")
+
+
+def write_batch(
+    supabase: Client,
+    chunk_ids: List[str],
+    embeddings: List[List[float]],
+    texts: List[str]
+) -> Dict[str, Any]:
+    """
+    Write generated embeddings for a batch of chunks.
+    
+    Args:
+        supabase: Supabase client
+        chunk_ids: Chunk IDs
+        embeddings: Embedding vectors (same order as chunk_ids)
+        texts: Chunk contents (same order as chunk_ids), for the embedding cache
+        
+    Returns:
+        Result dictionary with success count and errors
+    """
+    success_count = 0
+    errors = []
+    
+    for chunk_id, embedding in zip(chunk_ids, embeddings):
+        try:
+            update_chunk_embedding(supabase, chunk_id, embedding, 'completed')
+            success_count += 1
+        except Exception as e:
+            logger.error(f"Failed to update chunk {chunk_id}: {e}")
+            errors.append({'chunk_id': chunk_id, 'error': str(e)})
+    
+    # Mark chunks whose update failed in one request
+    try:
+        mark_chunks_failed(supabase, [error['chunk_id'] for error in errors])
+    except Exception as e:
+        logger.error(f"Failed to mark chunks as failed: {e}")
+    
+    cache_embeddings(supabase, texts, embeddings)
+    
+    return {
+        'success': success_count,
+        'failed': len(errors),
+        'errors': errors
+    }
+
+
+def _completed(result: Dict[str, Any]) -> Future:
+    """Wrap an already-known result in a resolved future."""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
 def process_batch(
     embedding_service: EmbeddingService,
     supabase: Client,
-    chunks: List[Dict[str, Any]]
-) -> Dict[str, Any]:
+    chunks: List[Dict[str, Any]],
+    writer: Executor
+) -> Future:
     """
     Process a batch of chunks.
     
+    Embeddings are generated on the calling thread; the database writes are
+    submitted to `writer` so they overlap with the next batch's embedding call.
+    
     Args:
         embedding_service: Embedding service instance
         supabase: Supabase client
         chunks: List of chunk records
+        writer: Executor that runs the database writes
         
     Returns:
-        Result dictionary with success count and errors
+        Future resolving to a result dictionary with success count and errors
     """
     if not chunks:
-        return {'success': 0, 'failed': 0, 'errors': []}
+        return _completed({'success': 0, 'failed': 0, 'errors': []})
     
     # Extract texts and IDs
     texts = [chunk['content'] for chunk in chunks]
@@ -121,44 +274,22 @@ def process_batch(
     try:
         # Generate embeddings in batch
         embeddings = embedding_service.generate_embeddings(texts)
-        
-        # Update chunks with embeddings
-        success_count = 0
-        errors = []
-        
-        for i, (chunk_id, embedding) in enumerate(zip(chunk_ids, embeddings)):
-            try:
-                update_chunk_embedding(supabase, chunk_id, embedding, 'completed')
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to update chunk {chunk_id}: {e}")
-                errors.append({'chunk_id': chunk_id, 'error': str(e)})
-                # Mark chunk as failed
-                try:
-                    update_chunk_embedding(supabase, chunk_id, [], 'failed')
-                except:
-                    pass
-        
-        return {
-            'success': success_count,
-            'failed': len(errors),
-            'errors': errors
-        }
-        
     except Exception as e:
         logger.error(f"Failed to generate embeddings for batch: {e}")
         # Mark all chunks as failed
-        for chunk_id in chunk_ids:
-            try:
-                update_chunk_embedding(supabase, chunk_id, [], 'failed')
-            except:
-                pass
+        try:
+            mark_chunks_failed(supabase, chunk_ids)
+        except Exception as mark_error:
+            logger.error(f"Failed to mark chunks as failed: {mark_error}")
         
-        return {
+        return _completed({
             'success': 0,
             'failed': len(chunks),
             'errors': [{'error': str(e)}]
-        }
+        })
+    
+    # Update chunks with embeddings in the background
+    return writer.submit(write_batch, supabase, chunk_ids, embeddings, texts)
 
 
 def log_processing_result(
@@ -209,15 +340,71 @@ def log_processing_result(
         logger.error(f"Failed to log processing result: {e}")
 
 
-def generate_embeddings(event, context):
+def process_chunks(
+    embedding_service: EmbeddingService,
+    supabase: Client,
+    chunks: List[Dict[str, Any]],
+    writer: Executor,
+    first_batch: int = 1
+) -> Dict[str, Any]:
+    """
+    Process chunks in batches, writing batch N while batch N+1 is embedded.
+    
+    Returns once every write has finished, so the chunks are no longer
+    'pending' when the caller fetches the next page.
+    
+    Args:
+        embedding_service: Embedding service instance
+        supabase: Supabase client
+        chunks: List of chunk records
+        writer: Executor that runs the database writes
+        first_batch: Number of the first batch (for logging)
+        
+    Returns:
+        Result dictionary with success, failed and batch counts
+    """
+    success_count = 0
+    failed_count = 0
+    pending = []
+    write_slots = threading.BoundedSemaphore(MAX_PENDING_WRITES)
+    
+    for batch_number, i in enumerate(range(0, len(chunks), BATCH_SIZE), start=first_batch):
+        batch = chunks[i:i + BATCH_SIZE]
+        
+        logger.info(f"Processing batch {batch_number} ({len(batch)} chunks)")
+        
+        # Wait if too many batches are still queued for the database
+        write_slots.acquire()
+        future = process_batch(embedding_service, supabase, batch, writer)
+        future.add_done_callback(lambda _: write_slots.release())
+        pending.append((batch_number, future))
+    
+    for batch_number, future in pending:
+        result = future.result()
+        success_count += result['success']
+        failed_count += result['failed']
+        
+        if result['errors']:
+            logger.warning(f"Batch {batch_number} had {len(result['errors'])} errors")
+    
+    return {
+        'success': success_count,
+        'failed': failed_count,
+        'batch_count': len(pending)
+    }
+
+
+def generate_embeddings(request):
     """
     Cloud Function entry point for embedding generation.
     
-    Triggered by Pub/Sub (on chunk creation) or Cloud Scheduler (periodic).
+    HTTP-triggered by Cloud Scheduler (periodic). A single invocation drains
+    the pending queue page by page until it is empty (or MAX_RUNTIME_SECONDS
+    is reached), so one warm instance handles the backlog instead of paying
+    a cold start per chunk-creation event.
     
     Args:
-        event: Pub/Sub event or Cloud Scheduler event
-        context: Cloud Function context
+        request: Cloud Function request object
     """
     start_time = datetime.utcnow()
     total_success = 0
@@ -228,30 +415,31 @@ def generate_embeddings(event, context):
         supabase = get_supabase_client()
         embedding_service = get_embedding_service()
         
-        # Get pending chunks
-        chunks = get_pending_chunks(supabase, limit=None)  # Process all pending chunks
+        batch_count = 0
+        last_id = None
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as writer:
+            while (datetime.utcnow() - start_time).total_seconds() < MAX_RUNTIME_SECONDS:
+                # Get the next page of pending chunks after the last one seen. Chunks
+                # whose 'failed' status could not be written stay pending; the id
+                # cursor skips them within this run instead of refetching them.
+                chunks = get_pending_chunks(supabase, limit=BATCH_SIZE * FETCH_BATCHES, after_id=last_id)
+                if not chunks:
+                    break
+                last_id = chunks[-1]['id']
+                
+                logger.info(f"Processing {len(chunks)} pending chunks")
+                
+                result = process_chunks(
+                    embedding_service, supabase, chunks, writer, first_batch=batch_count + 1
+                )
+                total_success += result['success']
+                total_failed += result['failed']
+                batch_count += result['batch_count']
         
-        if not chunks:
+        if not batch_count:
             logger.info("No pending chunks to process")
             return {'status': 'success', 'chunks_processed': 0, 'message': 'no_pending_chunks'}
         
-        logger.info(f"Processing {len(chunks)} pending chunks")
-        
-        # Process chunks in batches
-        batch_count = 0
-        for i in range(0, len(chunks), BATCH_SIZE):
-            batch = chunks[i:i + BATCH_SIZE]
-            batch_count += 1
-            
-            logger.info(f"Processing batch {batch_count} ({len(batch)} chunks)")
-            
-            result = process_batch(embedding_service, supabase, batch)
-            total_success += result['success']
-            total_failed += result['failed']
-            
-            if result['errors']:
-                logger.warning(f"Batch {batch_count} had {len(result['errors'])} errors")
-        
         # Log summary
         processing_time = (datetime.utcnow() - start_time).total_seconds()
         logger.info(
@@ -298,11 +486,8 @@ def generate_embeddings(event, context):
 
 # For local testing
 if __name__ == '__main__':
-    class MockEvent:
-        pass
-    
-    class MockContext:
+    class MockRequest:
         pass
     
-    result = generate_embeddings(MockEvent(), MockContext())
+    result = generate_embeddings(MockRequest())
     print(json.dumps(result, indent=2))
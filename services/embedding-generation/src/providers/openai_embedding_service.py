@@ -5,14 +5,43 @@ Implements EmbeddingService interface for OpenAI embeddings API.
 """
 
 import logging
+import threading
+import time
 from typing import List, Optional
 import openai
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import tiktoken
+from tenacity import Retrying, RetryCallState, stop_after_attempt, wait_exponential_jitter, retry_if_exception_type
 
 from ..interfaces.embedding_service import EmbeddingService
 
 logger = logging.getLogger(__name__)
 
+# Load the BPE table once per warm container rather than per call
+_ENC = tiktoken.encoding_for_model('text-embedding-3-small')
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Truncate text to at most max_tokens tokens."""
+    ids = _ENC.encode(text, disallowed_special=())
+    return _ENC.decode(ids[:max_tokens]) if len(ids) > max_tokens else text
+
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Read the server-requested delay from a rate limit error, if any."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
 
 class OpenAIEmbeddingService(EmbeddingService):
     """
@@ -24,7 +53,13 @@ class OpenAIEmbeddingService(EmbeddingService):
     DEFAULT_MODEL = 'text-embedding-3-small'
     DEFAULT_DIMENSIONS = 1536
     MAX_BATCH_SIZE = 2048  # OpenAI's max batch size
-    MAX_TEXT_LENGTH = 8000  # Approximate max tokens (model limit is 8191)
+    MAX_TOKENS = 8000  # Texts are truncated to this many tokens (model limit is 8191)
+    MAX_ATTEMPTS = 3
+
+    # Rate limits apply per API key, so a Retry-After pause is shared by every
+    # instance and thread rather than each one retrying on its own schedule
+    _rate_limit_lock = threading.Lock()
+    _rate_limited_until = 0.0
 
     def __init__(
         self,
@@ -49,6 +84,15 @@ class OpenAIEmbeddingService(EmbeddingService):
         
         # Initialize OpenAI client
         self.client = openai.OpenAI(api_key=api_key, timeout=timeout)
+        
+        # Retry controller built once and reused for every API call
+        self._fallback_wait = wait_exponential_jitter(initial=2, max=10)
+        self._retryer = Retrying(
+            stop=stop_after_attempt(self.MAX_ATTEMPTS),
+            wait=self._wait,
+            retry=retry_if_exception_type((openai.RateLimitError, openai.APIConnectionError)),
+            reraise=True
+        )
 
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -61,17 +105,14 @@ class OpenAIEmbeddingService(EmbeddingService):
             Embedding vector as list of floats
             
         Raises:
-            ValueError: If text is invalid
+            ValueError: If text is empty
             Exception: If embedding generation fails
         """
-        if not text or not text.strip():
+        if not text or text.isspace():
             raise ValueError("Text cannot be empty")
         
-        if len(text) > self.MAX_TEXT_LENGTH:
-            raise ValueError(f"Text too long (max {self.MAX_TEXT_LENGTH} characters)")
-        
         try:
-            response = self._call_api([text])
+            response = self._call_api([_truncate(text, self.MAX_TOKENS)])
             return response[0]
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
@@ -81,6 +122,8 @@ class OpenAIEmbeddingService(EmbeddingService):
         """
         Generate embeddings for multiple texts (batch).
         
+        Texts longer than MAX_TOKENS are truncated rather than rejected.
+        
         Args:
             texts: List of texts to generate embeddings for
             
@@ -88,23 +131,21 @@ class OpenAIEmbeddingService(EmbeddingService):
             List of embedding vectors
             
         Raises:
-            ValueError: If any text is invalid
+            ValueError: If any text is empty
             Exception: If embedding generation fails
         """
         if not texts:
             return []
         
-        # Validate texts
-        for i, text in enumerate(texts):
-            if not text or not text.strip():
-                raise ValueError(f"Text at index {i} is empty")
-            if len(text) > self.MAX_TEXT_LENGTH:
-                raise ValueError(f"Text at index {i} is too long (max {self.MAX_TEXT_LENGTH} characters)")
-        
-        # Process in batches if needed
+        # Process in batches if needed, validating each batch as it is sliced
         all_embeddings = []
         for i in range(0, len(texts), self.MAX_BATCH_SIZE):
             batch = texts[i:i + self.MAX_BATCH_SIZE]
+            for j, text in enumerate(batch, start=i):
+                # isspace() avoids allocating a stripped copy of every text
+                if not text or text.isspace():
+                    raise ValueError(f"Text at index {j} is empty")
+            batch = [_truncate(text, self.MAX_TOKENS) for text in batch]
             try:
                 batch_embeddings = self._call_api(batch)
                 all_embeddings.extend(batch_embeddings)
@@ -114,15 +155,50 @@ class OpenAIEmbeddingService(EmbeddingService):
         
         return all_embeddings
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((openai.RateLimitError, openai.APIConnectionError))
-    )
+    def _wait(self, retry_state: RetryCallState) -> float:
+        """
+        Delay before the next attempt.
+        
+        Honors the Retry-After header on rate limit errors and records it so
+        concurrent callers pause too; otherwise uses exponential backoff with jitter.
+        """
+        error = retry_state.outcome.exception()
+        retry_after = _retry_after_seconds(error) if isinstance(error, openai.RateLimitError) else None
+        if retry_after is None:
+            return self._fallback_wait(retry_state)
+        
+        with self._rate_limit_lock:
+            until = time.monotonic() + retry_after
+            if until > OpenAIEmbeddingService._rate_limited_until:
+                OpenAIEmbeddingService._rate_limited_until = until
+        return retry_after
+
+    def _wait_for_rate_limit(self) -> None:
+        """Sleep while a shared Retry-After pause is in effect."""
+        with self._rate_limit_lock:
+            delay = OpenAIEmbeddingService._rate_limited_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
     def _call_api(self, texts: List[str]) -> List[List[float]]:
         """
         Call OpenAI embeddings API with retry logic.
         
+        Args:
+            texts: List of texts to embed
+            
+        Returns:
+            List of embedding vectors
+        """
+        for attempt in self._retryer:
+            with attempt:
+                self._wait_for_rate_limit()
+                return self._request_embeddings(texts)
+
+    def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Make a single embeddings API request.
+        
         Args:
             texts: List of texts to embed
             
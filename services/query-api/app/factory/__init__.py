@@ -4,6 +4,6 @@ Service Factories
 Factory functions for creating service instances.
 """
 
-from .query_service_factory import create_query_service
+from .query_service_factory import create_query_service, get_query_service
 
-__all__ = ["create_query_service"]
+__all__ = ["create_query_service", "get_query_service"]
@@ -6,6 +6,7 @@ Factory for creating QueryService instances based on provider type.
 
 import os
 import logging
+from functools import lru_cache
 from typing import Dict, Any
 
 from app.interfaces.query_service import QueryService
@@ -46,10 +47,25 @@ def create_query_service(
             model=config.get("model", os.getenv("OPENAI_MODEL", "gpt-4")),
             temperature=config.get("temperature", 0.7),
             max_tokens=config.get("max_tokens", 1000),
-            timeout=config.get("timeout", 60)
+            timeout=config.get("timeout", 60),
+            max_context_tokens=config.get("max_context_tokens", int(os.getenv("MAX_CONTEXT_TOKENS", "6000")))
         )
     elif provider_type == "anthropic":
         # TODO: Implement AnthropicQueryService when needed
         raise NotImplementedError("Anthropic provider not yet implemented")
     else:
         raise ValueError(f"Unsupported query provider: {provider_type}")
+
+
+@lru_cache(maxsize=1)
+def get_query_service() -> QueryService:
+    """
+    Get the process-wide QueryService for the configured provider (created on first use).
+    
+    Prefer this to create_query_service in request handlers: the service owns
+    an API client whose connection pool is only reused if the service is.
+    
+    Returns:
+        Shared QueryService instance
+    """
+    return create_query_service()
@@ -5,11 +5,11 @@ Provider-agnostic interface for LLM query services (OpenAI GPT-4, Claude, etc.).
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Union
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TokenUsage:
     """Token usage statistics."""
     input_tokens: int
@@ -18,7 +18,7 @@ class TokenUsage:
     cost_usd: Optional[float] = None  # Estimated cost in USD
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class QueryResult:
     """Result from query processing."""
     answer: str
@@ -81,6 +81,33 @@ class QueryService(ABC):
         """
         pass
     
+    async def stream_query(
+        self,
+        query: str,
+        context_chunks: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[Union[str, QueryResult]]:
+        """
+        Process a query, yielding the answer as it is generated.
+        
+        Providers without streaming support fall back to process_query and
+        yield the whole answer at once.
+        
+        Args:
+            query: User query text
+            context_chunks: Retrieved context chunks with metadata
+            conversation_history: Optional conversation history for context
+            
+        Yields:
+            Answer text deltas, then a final QueryResult for the full answer
+            
+        Raises:
+            Exception: If query processing fails
+        """
+        result = await self.process_query(query, context_chunks, conversation_history)
+        yield result.answer
+        yield result
+    
     @abstractmethod
     def get_provider_name(self) -> str:
         """
@@ -7,7 +7,7 @@ FastAPI application for processing RAG queries with vector search and LLM integr
 import os
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
 
 from app.routes import query
@@ -23,6 +23,7 @@ app = FastAPI(
     title="My Building Board Query API",
     description="RAG query processing API with vector search and LLM integration",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS configuration
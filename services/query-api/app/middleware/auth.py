@@ -2,11 +2,19 @@
 Authentication Middleware
 
 Supabase JWT validation and user context extraction.
+
+App membership is answered from the token's app_metadata.app_ids claim, or
+from a cached app_members lookup, so revocation is not immediate: a user
+removed from an app keeps access until their token is refreshed (up to its
+exp), plus up to MEMBERSHIP_CACHE_TTL_SECONDS for memberships confirmed by
+the lookup. Routes that need immediate revocation must query app_members.
 """
 
 import os
+import time
 import logging
 from typing import Optional
+from cachetools import TTLCache
 from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import create_client, Client
@@ -22,11 +30,26 @@ SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 if not SUPABASE_URL or not SUPABASE_JWT_SECRET:
     raise ValueError("SUPABASE_URL and SUPABASE_JWT_SECRET must be set")
 
+# Verified user contexts keyed by raw token, as (expires_at, user_context).
+# Entries are also bounded by the token's own exp claim.
+_TOKEN_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+# Memberships confirmed by the app_members fallback, keyed by (user_id, app_id);
+# a removed member keeps access for up to this long after their token stops
+# carrying the app
+MEMBERSHIP_CACHE_TTL_SECONDS = int(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "300"))
+_MEMBERSHIP_CACHE: TTLCache = TTLCache(maxsize=50_000, ttl=MEMBERSHIP_CACHE_TTL_SECONDS)
+
+# Shared client so membership checks reuse one HTTP connection pool
+_supabase_client: Optional[Client] = None
+
 
 def get_supabase_client() -> Client:
-    """Get Supabase client."""
-    from supabase import create_client
-    return create_client(SUPABASE_URL, SUPABASE_JWT_SECRET)
+    """Get the shared Supabase client (created on first use)."""
+    global _supabase_client
+    if _supabase_client is None:
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_JWT_SECRET)
+    return _supabase_client
 
 
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
@@ -44,6 +67,11 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     """
     token = credentials.credentials
     
+    # Skip HMAC verification and JSON parsing for recently verified tokens
+    cached = _TOKEN_CACHE.get(token)
+    if cached and cached[0] > time.time():
+        return cached[1]
+    
     try:
         # Decode JWT token (Supabase uses HS256)
         # In production, verify with Supabase's public key
@@ -59,12 +87,15 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
         
-        return {
+        user_context = {
             "user_id": user_id,
             "email": payload.get("email"),
             "app_metadata": payload.get("app_metadata", {}),
             "user_metadata": payload.get("user_metadata", {}),
         }
+        _TOKEN_CACHE[token] = (payload.get("exp", float("inf")), user_context)
+        
+        return user_context
         
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -103,28 +134,44 @@ def get_app_id_from_request(request: Request, user_context: dict) -> Optional[st
     return None
 
 
-async def verify_app_membership(
-    user_id: str,
-    app_id: str,
-    supabase: Client
-) -> bool:
+async def verify_app_membership(user_context: dict, app_id: str) -> bool:
     """
     Verify user is a member of the app.
     
+    Memberships are mirrored into the JWT as app_metadata.app_ids, so the
+    check is normally answered from the already-verified token. Tokens issued
+    before a membership was added fall back to an app_members lookup, whose
+    positive results are cached for MEMBERSHIP_CACHE_TTL_SECONDS. Removal
+    therefore takes effect only once the token is refreshed and the cached
+    entry has expired (see the module docstring).
+    
     Args:
-        user_id: User ID
+        user_context: User context from verify_token
         app_id: App ID
-        supabase: Supabase client
         
     Returns:
         True if user is a member, False otherwise
     """
+    if app_id in user_context.get("app_metadata", {}).get("app_ids", []):
+        return True
+    
+    cache_key = (user_context["user_id"], app_id)
+    if cache_key in _MEMBERSHIP_CACHE:
+        return True
+    
     try:
-        result = supabase.table("app_members").select("*").eq("app_id", app_id).eq("user_id", user_id).execute()
-        return len(result.data) > 0
+        # Only existence matters, so fetch a single narrow row
+        supabase = get_supabase_client()
+        result = supabase.table("app_members").select("user_id").eq("app_id", app_id).eq("user_id", user_context["user_id"]).limit(1).execute()
     except Exception as e:
         logger.error(f"Failed to verify app membership: {e}")
         return False
+    
+    if not result.data:
+        return False
+    
+    _MEMBERSHIP_CACHE[cache_key] = True
+    return True
 
 
 async def require_auth(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
@@ -157,8 +204,7 @@ async def require_app_membership(
         )
     
     # Verify app membership
-    supabase = get_supabase_client()
-    if not await verify_app_membership(user_id, app_id, supabase):
+    if not await verify_app_membership(user_context, app_id):
         raise HTTPException(
             status_code=403,
             detail=f"User is not a member of app {app_id}"
@@ -5,7 +5,7 @@ Pydantic models for query API requests and responses.
 """
 
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class QueryRequest(BaseModel):
@@ -17,10 +17,14 @@ class QueryRequest(BaseModel):
     conversation_id: Optional[str] = Field(None, description="Conversation/thread ID for follow-up questions")
     include_sources: Optional[bool] = Field(True, description="Include source citations in response")
     response_format: Optional[str] = Field("text", description="Response format: 'text', 'html', or 'plain'")
+    stream: Optional[bool] = Field(False, description="Stream the answer as Server-Sent Events")
 
 
 class Source(BaseModel):
     """Source citation model."""
+    # Built with model_construct from trusted server-side data
+    model_config = ConfigDict(extra="ignore", frozen=False)
+    
     chunk_id: str
     email_id: str
     email_subject: Optional[str] = None
@@ -32,6 +36,8 @@ class Source(BaseModel):
 
 class TokenUsage(BaseModel):
     """Token usage statistics."""
+    model_config = ConfigDict(extra="ignore", frozen=False)
+    
     input_tokens: int
     output_tokens: int
     total_tokens: int
@@ -40,6 +46,8 @@ class TokenUsage(BaseModel):
 
 class QueryResponse(BaseModel):
     """Query response model."""
+    model_config = ConfigDict(extra="ignore", frozen=False)
+    
     answer: str = Field(..., description="Generated answer with inline citations")
     sources: List[Source] = Field(default_factory=list, description="Source citations")
     query_id: Optional[str] = Field(None, description="Query ID for logging")
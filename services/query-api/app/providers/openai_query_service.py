@@ -5,9 +5,14 @@ OpenAI GPT-4 implementation of QueryService interface.
 """
 
 import os
+import json
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import unicodedata
+from typing import AsyncIterator, List, Dict, Any, Optional, Union
 import openai
+import tiktoken
+from cachetools import LRUCache, TTLCache
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -28,6 +33,30 @@ OPENAI_PRICING = {
     "gpt-3.5-turbo": {"input": 0.0015, "output": 0.002},
 }
 
+# Static instructions sent as the system message. Keeping them identical and first
+# in every request lets OpenAI's automatic prompt caching reuse the prefix.
+SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on the provided context from email documents and attachments.
+
+Instructions:
+- Answer the question based only on the provided context
+- If the context doesn't contain enough information, say so
+- Cite sources using [Source 1], [Source 2], etc. in your answer
+- Be concise and accurate
+- If you're unsure, indicate that"""
+
+# Responses are only reused when deterministic (temperature 0) unless forced on
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+
+# Exact-match cache of chat completion results, keyed by request hash
+_RESPONSE_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=600)
+
+# Tokenizer for context budgeting (cl100k_base, shared by the GPT-4 family)
+_ENC = tiktoken.encoding_for_model("gpt-4")
+
+# Token ids of recently used chunks, keyed by chunk_id, so follow-up
+# questions over the same documents skip the encoder
+_CHUNK_TOKEN_CACHE: LRUCache = LRUCache(maxsize=4096)
+
 
 class OpenAIQueryService(QueryService):
     """
@@ -43,7 +72,8 @@ class OpenAIQueryService(QueryService):
         model: str = "gpt-4",
         temperature: float = 0.7,
         max_tokens: int = 1000,
-        timeout: int = 60
+        timeout: int = 60,
+        max_context_tokens: int = 6000
     ):
         """
         Initialize OpenAI QueryService.
@@ -54,6 +84,7 @@ class OpenAIQueryService(QueryService):
             temperature: Sampling temperature (default: 0.7)
             max_tokens: Maximum tokens in response (default: 1000)
             timeout: Request timeout in seconds (default: 60)
+            max_context_tokens: Token budget for context chunks (default: 6000)
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
@@ -63,6 +94,12 @@ class OpenAIQueryService(QueryService):
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.timeout = timeout
+        self.max_context_tokens = max_context_tokens
+        
+        # Per-token prices for this model (OPENAI_PRICING is per 1K tokens)
+        pricing = OPENAI_PRICING.get(model, OPENAI_PRICING["gpt-4"])
+        self._input_cost_per_token = pricing["input"] / 1000
+        self._output_cost_per_token = pricing["output"] / 1000
         
         self.client = openai.AsyncOpenAI(api_key=self.api_key, timeout=self.timeout)
     
@@ -70,6 +107,47 @@ class OpenAIQueryService(QueryService):
         """Get provider name."""
         return "openai"
     
+    def _fit_context(self, context_chunks: List[Dict[str, Any]]) -> List[str]:
+        """
+        Fit chunk contents into the context token budget.
+        
+        Chunks arrive ordered by similarity, so the order is kept (and
+        [Source N] numbering still matches the sources list); the least
+        similar chunks at the end are truncated or dropped first.
+        
+        Args:
+            context_chunks: Retrieved context chunks
+            
+        Returns:
+            Chunk contents that fit within max_context_tokens
+        """
+        contents = []
+        used = 0
+        for chunk in context_chunks:
+            content = chunk.get("content", "")
+            chunk_id = chunk.get("chunk_id")
+            
+            ids = _CHUNK_TOKEN_CACHE.get(chunk_id) if chunk_id else None
+            if ids is None:
+                ids = _ENC.encode(content, disallowed_special=())
+                if chunk_id:
+                    _CHUNK_TOKEN_CACHE[chunk_id] = ids
+            
+            remaining = self.max_context_tokens - used
+            if len(ids) > remaining:
+                if remaining > 0:
+                    contents.append(_ENC.decode(ids[:remaining]))
+                logger.info(
+                    f"Context truncated to {self.max_context_tokens} tokens "
+                    f"({len(contents)} of {len(context_chunks)} chunks)"
+                )
+                break
+            
+            contents.append(content)
+            used += len(ids)
+        
+        return contents
+    
     def _create_prompt(
         self,
         query: str,
@@ -77,7 +155,10 @@ class OpenAIQueryService(QueryService):
         conversation_history: Optional[List[Dict[str, str]]] = None
     ) -> str:
         """
-        Create prompt for LLM with context.
+        Create the user prompt for LLM with context.
+        
+        Instructions live in SYSTEM_PROMPT; this only carries the variable
+        context, history and question.
         
         Args:
             query: User query
@@ -87,38 +168,34 @@ class OpenAIQueryService(QueryService):
         Returns:
             Formatted prompt
         """
-        # Format context chunks
-        context_text = "\n\n".join([
-            f"[Source {i+1}]\n{chunk.get('content', '')}"
-            for i, chunk in enumerate(context_chunks)
-        ])
+        # Build the whole prompt with one join over a flat list of pieces,
+        # rather than a formatted string per chunk joined into an intermediate
+        # context string that is then copied again into the template
+        parts = ["Context:\n"]
+        append = parts.append
+        for i, content in enumerate(self._fit_context(context_chunks), start=1):
+            if i > 1:
+                append("\n\n")
+            append("[Source ")
+            append(str(i))
+            append("]\n")
+            append(content)
+        append("\n")
         
-        # Format conversation history if provided
-        history_text = ""
+        # Conversation history goes into the same list (last 3 exchanges)
         if conversation_history:
-            history_text = "\n\nPrevious conversation:\n" + "\n".join([
-                f"User: {msg.get('user', '')}\nAssistant: {msg.get('assistant', '')}"
-                for msg in conversation_history[-3:]  # Last 3 exchanges
-            ])
+            append("\n\nPrevious conversation:")
+            for msg in conversation_history[-3:]:
+                append("\nUser: ")
+                append(msg.get("user", ""))
+                append("\nAssistant: ")
+                append(msg.get("assistant", ""))
         
-        prompt = f"""You are a helpful assistant that answers questions based on the provided context from email documents and attachments.
-
-Context:
-{context_text}
-{history_text}
-
-Question: {query}
-
-Instructions:
-- Answer the question based only on the provided context
-- If the context doesn't contain enough information, say so
-- Cite sources using [Source 1], [Source 2], etc. in your answer
-- Be concise and accurate
-- If you're unsure, indicate that
-
-Answer:"""
+        append("\n\nQuestion: ")
+        append(query)
+        append("\n\nAnswer:")
         
-        return prompt
+        return "".join(parts)
     
     def _calculate_cost(
         self,
@@ -135,10 +212,36 @@ Answer:"""
         Returns:
             Estimated cost in USD
         """
-        pricing = OPENAI_PRICING.get(self.model, OPENAI_PRICING["gpt-4"])
-        input_cost = (input_tokens / 1000) * pricing["input"]
-        output_cost = (output_tokens / 1000) * pricing["output"]
-        return input_cost + output_cost
+        return input_tokens * self._input_cost_per_token + output_tokens * self._output_cost_per_token
+    
+    def _response_cache_key(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Build an exact-match cache key for a chat completion request.
+        
+        Args:
+            messages: Chat messages
+            
+        Returns:
+            SHA-256 hex digest of the normalized request
+        """
+        normalized = [
+            {
+                "role": message["role"].strip().lower(),
+                "content": unicodedata.normalize("NFC", message["content"]).strip(),
+            }
+            for message in messages
+        ]
+        request = json.dumps(
+            {
+                "model": self.model,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "messages": normalized,
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
     
     @retry(
         stop=stop_after_attempt(3),
@@ -160,7 +263,7 @@ Answer:"""
         
         Args:
             prompt: User prompt
-            system_message: Optional system message
+            system_message: Optional system message (defaults to SYSTEM_PROMPT)
             
         Returns:
             OpenAI API response
@@ -169,15 +272,19 @@ Answer:"""
             Exception: If API call fails after retries
         """
         try:
-            messages = []
-            if system_message:
-                messages.append({"role": "system", "content": system_message})
-            else:
-                messages.append({
-                    "role": "system",
-                    "content": "You are a helpful assistant that answers questions based on provided context."
-                })
-            messages.append({"role": "user", "content": prompt})
+            messages = [
+                {"role": "system", "content": system_message or SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ]
+            
+            # Serve identical deterministic requests without an API round-trip
+            cache_key = None
+            if self.temperature == 0 or LLM_RESPONSE_CACHE_ENABLED:
+                cache_key = self._response_cache_key(messages)
+                cached = _RESPONSE_CACHE.get(cache_key)
+                if cached is not None:
+                    logger.info("LLM response cache hit")
+                    return cached
             
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -186,7 +293,7 @@ Answer:"""
                 max_tokens=self.max_tokens,
             )
             
-            return {
+            result = {
                 "answer": response.choices[0].message.content,
                 "usage": {
                     "prompt_tokens": response.usage.prompt_tokens,
@@ -196,6 +303,11 @@ Answer:"""
                 "model": response.model,
             }
             
+            if cache_key is not None and result["answer"]:
+                _RESPONSE_CACHE[cache_key] = result
+            
+            return result
+            
         except openai.RateLimitError as e:
             logger.warning(f"OpenAI rate limit error: {e}")
             raise
@@ -274,6 +386,91 @@ Answer:"""
             logger.error(f"Failed to process query: {e}", exc_info=True)
             raise
     
+    async def stream_query(
+        self,
+        query: str,
+        context_chunks: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[Union[str, QueryResult]]:
+        """
+        Process a query with context using OpenAI, streaming the answer.
+        
+        Not retried or cached: a retry after tokens have been forwarded
+        would duplicate output.
+        
+        Args:
+            query: User query text
+            context_chunks: Retrieved context chunks with metadata
+            conversation_history: Optional conversation history for context
+            
+        Yields:
+            Answer text deltas, then a final QueryResult for the full answer
+            
+        Raises:
+            Exception: If query processing fails
+        """
+        if not query or not query.strip():
+            raise ValueError("Query cannot be empty")
+        
+        if not context_chunks:
+            raise ValueError("Context chunks cannot be empty")
+        
+        prompt = self._create_prompt(query, context_chunks, conversation_history)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        
+        parts = []
+        model = self.model
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True,
+            )
+            async for chunk in stream:
+                model = chunk.model or model
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except openai.APIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            raise Exception(f"OpenAI API error: {str(e)}")
+        
+        answer = "".join(parts)
+        if not answer:
+            raise Exception("OpenAI returned empty response")
+        
+        # Streamed completions carry no usage in this SDK version, so count
+        # locally (each chat message adds ~4 framing tokens, the reply 3)
+        input_tokens = sum(
+            len(_ENC.encode(message["content"], disallowed_special=())) + 4
+            for message in messages
+        ) + 3
+        output_tokens = len(_ENC.encode(answer, disallowed_special=()))
+        
+        yield QueryResult(
+            answer=answer,
+            token_usage=TokenUsage(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+                cost_usd=self._calculate_cost(input_tokens, output_tokens)
+            ),
+            model=model,
+            metadata={
+                "provider": "openai",
+                "model": model,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "streamed": True,
+            }
+        )
+    
     async def get_answer(
         self,
         query: str,
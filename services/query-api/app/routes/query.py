@@ -6,15 +6,22 @@ API routes for query processing.
 
 import time
 import uuid
-from typing import Tuple, Optional
-from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Tuple, Optional
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from supabase import create_client, Client
 
 from app.models.query import QueryRequest, QueryResponse, Source, TokenUsage
+from app.interfaces.query_service import QueryResult
 from app.middleware.auth import require_app_membership
+from app.utils.responses import PydanticResponse
 from app.services.embedding_service import generate_query_embedding
-from app.services.vector_search import search_similar_chunks
-from app.factory.query_service_factory import create_query_service
+from app.services.vector_search import search_similar_chunks, to_columns
+from app.services.semantic_cache import query_response_cache
+from app.factory.query_service_factory import get_query_service
 from app.utils.citations import (
     format_inline_citations,
     format_source_list,
@@ -28,20 +35,119 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Shared client so every query reuses one HTTP connection pool
+_supabase_client: Optional[Client] = None
+
 
 def get_supabase_client() -> Client:
-    """Get Supabase client."""
-    from supabase import create_client
-    return create_client(
-        os.getenv("SUPABASE_URL"),
-        os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    )
+    """Get the shared Supabase client (created on first use)."""
+    global _supabase_client
+    if _supabase_client is None:
+        _supabase_client = create_client(
+            os.getenv("SUPABASE_URL"),
+            os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        )
+    return _supabase_client
+
+
+async def fetch_email_subjects(email_ids: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Fetch email subjects in one query, off the event loop.
+    
+    Args:
+        email_ids: Email IDs
+        
+    Returns:
+        Mapping of email ID to subject (empty on failure)
+    """
+    if not email_ids:
+        return {}
+    
+    try:
+        supabase = get_supabase_client()
+        result = await asyncio.to_thread(
+            lambda: supabase.table("emails").select("id,subject").in_("id", email_ids).execute()
+        )
+        return {row["id"]: row.get("subject") for row in result.data or []}
+    except Exception as e:
+        logger.warning(f"Failed to fetch email metadata: {e}")
+        return {}
+
+
+async def fetch_attachment_filenames(attachment_ids: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Fetch attachment filenames in one query, off the event loop.
+    
+    Args:
+        attachment_ids: Attachment IDs
+        
+    Returns:
+        Mapping of attachment ID to filename (empty on failure)
+    """
+    if not attachment_ids:
+        return {}
+    
+    try:
+        supabase = get_supabase_client()
+        result = await asyncio.to_thread(
+            lambda: supabase.table("attachments").select("id,filename").in_("id", attachment_ids).execute()
+        )
+        return {row["id"]: row.get("filename") for row in result.data or []}
+    except Exception as e:
+        logger.warning(f"Failed to fetch attachment metadata: {e}")
+        return {}
 
 
-@router.post("/query", response_model=QueryResponse)
+def log_query(record: Dict[str, Any]) -> None:
+    """
+    Insert a query record into email_queries.
+    
+    Run as a background task so the insert happens after the response is sent.
+    
+    Args:
+        record: email_queries row
+    """
+    try:
+        get_supabase_client().table("email_queries").insert(record).execute()
+    except Exception as e:
+        logger.error(f"Failed to log query: {e}")
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """
+    Encode one Server-Sent Event with a JSON payload.
+    
+    Args:
+        event: Event name
+        data: Pydantic model or JSON-compatible value
+        
+    Returns:
+        Encoded event
+    """
+    payload = data.model_dump_json().encode("utf-8") if isinstance(data, BaseModel) else orjson.dumps(data)
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + payload + b"\n\n"
+
+
+async def replay_events(response: QueryResponse) -> AsyncIterator[bytes]:
+    """Stream an already complete response as one token event plus done."""
+    yield sse_event("token", {"delta": response.answer})
+    yield sse_event("done", response)
+
+
+def respond(response: QueryResponse, stream: bool):
+    """Return a complete response as JSON, or as SSE for streaming clients."""
+    if stream:
+        return StreamingResponse(replay_events(response), media_type="text/event-stream")
+    return PydanticResponse(response)
+
+
+# The response is serialized directly from the model (no response_model
+# re-validation); `responses` keeps QueryResponse in the OpenAPI schema.
+@router.post("/query", response_model=None, responses={200: {"model": QueryResponse}})
 async def process_query(
     request: QueryRequest,
     request_obj: Request,
+    background_tasks: BackgroundTasks,
     user_app: Tuple[str, str] = Depends(require_app_membership)
 ):
     """
@@ -52,6 +158,11 @@ async def process_query(
     2. Search for similar chunks (vector search)
     3. Generate answer using LLM with context
     4. Format response with citations
+    
+    With `stream` set, the answer is sent as Server-Sent Events: `token`
+    events carry answer deltas as they are generated, then a `done` event
+    carries the full QueryResponse (citations formatted, sources attached),
+    or an `error` event if processing fails mid-stream.
     """
     start_time = time.time()
     user_id, app_id = user_app
@@ -69,6 +180,39 @@ async def process_query(
         logger.info(f"Generating embedding for query: {request.query[:50]}...")
         query_embedding = await generate_query_embedding(request.query)
         
+        # Return the stored answer for a near-identical earlier query, skipping
+        # vector search and the LLM call. Scoped by app and the request options
+        # that shape the response.
+        cache_scope = (
+            app_id,
+            request.top_k,
+            request.similarity_threshold,
+            request.include_sources,
+            request.response_format,
+        )
+        cached_response = query_response_cache.lookup(cache_scope, query_embedding)
+        if cached_response is not None:
+            processing_time = int((time.time() - start_time) * 1000)
+            
+            # Log cached query after the response is sent
+            background_tasks.add_task(log_query, {
+                "id": query_id,
+                "app_id": app_id,
+                "user_id": user_id,
+                "query_text": request.query,
+                "answer_text": cached_response.answer,
+                "sources_used": [s.chunk_id for s in cached_response.sources],
+                "status": "completed",
+                "processing_time_ms": processing_time,
+            })
+            
+            return respond(cached_response.model_copy(update={
+                "query_id": query_id,
+                "processing_time_ms": processing_time,
+                "token_usage": None,
+                "metadata": {**cached_response.metadata, "cache_hit": True},
+            }), request.stream)
+        
         # Step 2: Search for similar chunks
         logger.info(f"Searching for similar chunks (app_id: {app_id}, top_k: {request.top_k})")
         search_results = await search_similar_chunks(
@@ -85,23 +229,19 @@ async def process_query(
                 "Please try rephrasing your query or check if documents have been indexed."
             )
             
-            # Log query with no results
-            try:
-                supabase = get_supabase_client()
-                supabase.table("email_queries").insert({
-                    "id": query_id,
-                    "app_id": app_id,
-                    "user_id": user_id,
-                    "query_text": request.query,
-                    "answer_text": error_message,
-                    "sources_used": [],
-                    "status": "no_results",
-                    "processing_time_ms": processing_time,
-                }).execute()
-            except Exception as e:
-                logger.error(f"Failed to log query: {e}")
+            # Log query with no results after the response is sent
+            background_tasks.add_task(log_query, {
+                "id": query_id,
+                "app_id": app_id,
+                "user_id": user_id,
+                "query_text": request.query,
+                "answer_text": error_message,
+                "sources_used": [],
+                "status": "no_results",
+                "processing_time_ms": processing_time,
+            })
             
-            return QueryResponse(
+            return respond(QueryResponse.model_construct(
                 answer=error_message,
                 sources=[],
                 query_id=query_id,
@@ -111,107 +251,92 @@ async def process_query(
                     "app_id": app_id,
                     "status": "no_results",
                 }
+            ), request.stream)
+        
+        # Split rows into per-field columns once; everything below reads these
+        columns = to_columns(search_results)
+        
+        # Start source metadata lookups now so they overlap with the LLM call
+        if request.include_sources:
+            metadata_task = asyncio.gather(
+                fetch_email_subjects([i for i in set(columns.email_ids) if i]),
+                fetch_attachment_filenames([i for i in set(columns.attachment_ids) if i]),
             )
         
         # Step 3: Generate answer using LLM via QueryService
-        logger.info(f"Generating answer with {len(search_results)} context chunks")
+        logger.info(f"Generating answer with {len(columns)} context chunks")
         
-        # Create QueryService instance
-        query_service = create_query_service()
+        # Shared QueryService (its OpenAI client keeps connections alive across requests)
+        query_service = get_query_service()
         
-        # Prepare context chunks for QueryService
+        # Prepare context chunks for QueryService (the prompt only reads these fields)
         context_chunks = [
-            {
-                "content": result.get("content", ""),
-                "chunk_id": result.get("chunk_id"),
-                "email_id": result.get("email_id"),
-                "attachment_id": result.get("attachment_id"),
-                "similarity": result.get("similarity", 0.0),
-            }
-            for result in search_results
+            {"content": content, "chunk_id": chunk_id}
+            for content, chunk_id in zip(columns.contents, columns.chunk_ids)
         ]
         
-        # Process query with QueryService
-        query_result = await query_service.process_query(
-            query=request.query,
-            context_chunks=context_chunks,
-            conversation_history=None  # TODO: Add conversation history support
-        )
-        
-        answer = query_result.answer
-        
-        # Step 4: Format sources with metadata
-        sources = []
-        sources_dict = []  # For citation formatting
-        if request.include_sources:
-            # Fetch additional metadata for sources
-            supabase = get_supabase_client()
+        async def build_response(query_result: QueryResult) -> QueryResponse:
+            """Format the answer and sources and schedule the query log."""
+            answer = query_result.answer
             
-            for result in search_results:
-                email_subject = None
-                attachment_filename = None
-                
-                # Fetch email metadata if available
-                if result.get("email_id"):
-                    try:
-                        email_data = supabase.table("emails").select("subject").eq("id", result["email_id"]).single().execute()
-                        if email_data.data:
-                            email_subject = email_data.data.get("subject")
-                    except Exception as e:
-                        logger.warning(f"Failed to fetch email metadata: {e}")
-                
-                # Fetch attachment metadata if available
-                if result.get("attachment_id"):
-                    try:
-                        attachment_data = supabase.table("attachments").select("filename").eq("id", result["attachment_id"]).single().execute()
-                        if attachment_data.data:
-                            attachment_filename = attachment_data.data.get("filename")
-                    except Exception as e:
-                        logger.warning(f"Failed to fetch attachment metadata: {e}")
+            # Step 4: Format sources with metadata
+            sources = []
+            sources_dict = []  # For citation formatting
+            if request.include_sources:
+                # Additional metadata for sources (fetched alongside the LLM call)
+                email_subjects, attachment_filenames = await metadata_task
                 
-                source_obj = Source(
-                    chunk_id=result.get("chunk_id"),
-                    email_id=result.get("email_id"),
-                    email_subject=email_subject,
-                    attachment_id=result.get("attachment_id"),
-                    attachment_filename=attachment_filename,
-                    similarity=result.get("similarity", 0.0),
-                    content_preview=result.get("content", "")[:200] + "..." if len(result.get("content", "")) > 200 else result.get("content", ""),
-                )
-                sources.append(source_obj)
-                
-                # Also create dict for citation formatting
-                sources_dict.append({
-                    "chunk_id": source_obj.chunk_id,
-                    "email_id": source_obj.email_id,
-                    "email_subject": source_obj.email_subject,
-                    "attachment_id": source_obj.attachment_id,
-                    "attachment_filename": source_obj.attachment_filename,
-                    "similarity": source_obj.similarity,
-                    "content_preview": source_obj.content_preview,
-                })
-        
-        # Format answer based on response format
-        response_format = request.response_format or "text"
-        base_url = os.getenv("NEXT_PUBLIC_APP_URL", "https://localhost:3000")
-        
-        if response_format == "html":
-            answer = format_html_response(answer, sources_dict, base_url, app_id)
-        elif response_format == "plain":
-            answer = format_plain_text_response(answer, sources_dict)
-        else:
-            # Default: text with inline citations
-            answer = format_inline_citations(answer, sources_dict)
-        
-        # Format sources with dashboard links for metadata
-        formatted_sources_metadata = format_source_list(sources_dict, base_url, app_id) if sources_dict else []
-        
-        processing_time = int((time.time() - start_time) * 1000)
-        
-        # Step 5: Log query with token usage
-        try:
-            supabase = get_supabase_client()
-            supabase.table("email_queries").insert({
+                for chunk_id, email_id, attachment_id, similarity, content in zip(
+                    columns.chunk_ids,
+                    columns.email_ids,
+                    columns.attachment_ids,
+                    columns.similarities,
+                    columns.contents,
+                ):
+                    email_subject = email_subjects.get(email_id)
+                    attachment_filename = attachment_filenames.get(attachment_id)
+                    content_preview = content[:200] + "..." if len(content) > 200 else content
+                    
+                    sources.append(Source.model_construct(
+                        chunk_id=chunk_id,
+                        email_id=email_id,
+                        email_subject=email_subject,
+                        attachment_id=attachment_id,
+                        attachment_filename=attachment_filename,
+                        similarity=similarity,
+                        content_preview=content_preview,
+                    ))
+                    
+                    # Also create dict for citation formatting
+                    sources_dict.append({
+                        "chunk_id": chunk_id,
+                        "email_id": email_id,
+                        "email_subject": email_subject,
+                        "attachment_id": attachment_id,
+                        "attachment_filename": attachment_filename,
+                        "similarity": similarity,
+                        "content_preview": content_preview,
+                    })
+            
+            # Format answer based on response format
+            response_format = request.response_format or "text"
+            base_url = os.getenv("NEXT_PUBLIC_APP_URL", "https://localhost:3000")
+            
+            if response_format == "html":
+                answer = format_html_response(answer, sources_dict, base_url, app_id)
+            elif response_format == "plain":
+                answer = format_plain_text_response(answer, sources_dict)
+            else:
+                # Default: text with inline citations
+                answer = format_inline_citations(answer, sources_dict)
+            
+            # Format sources with dashboard links for metadata
+            formatted_sources_metadata = format_source_list(sources_dict, base_url, app_id) if sources_dict else []
+            
+            processing_time = int((time.time() - start_time) * 1000)
+            
+            # Step 5: Log query with token usage after the response is sent
+            background_tasks.add_task(log_query, {
                 "id": query_id,
                 "app_id": app_id,
                 "user_id": user_id,
@@ -226,45 +351,93 @@ async def process_query(
                     "total_tokens": query_result.token_usage.total_tokens,
                     "cost_usd": query_result.token_usage.cost_usd,
                 } if query_result.token_usage else None,
-            }).execute()
-        except Exception as e:
-            logger.error(f"Failed to log query: {e}")
-        
-        # Format token usage for response
-        token_usage = None
-        if query_result.token_usage:
-            token_usage = TokenUsage(
-                input_tokens=query_result.token_usage.input_tokens,
-                output_tokens=query_result.token_usage.output_tokens,
-                total_tokens=query_result.token_usage.total_tokens,
-                cost_usd=query_result.token_usage.cost_usd,
+            })
+            
+            # Format token usage for response
+            token_usage = None
+            if query_result.token_usage:
+                token_usage = TokenUsage.model_construct(
+                    input_tokens=query_result.token_usage.input_tokens,
+                    output_tokens=query_result.token_usage.output_tokens,
+                    total_tokens=query_result.token_usage.total_tokens,
+                    cost_usd=query_result.token_usage.cost_usd,
+                )
+            
+            # Add dashboard links to metadata
+            source_links = {
+                str(formatted_source["citation_number"]): formatted_source.get("links", {})
+                for formatted_source in formatted_sources_metadata
+                if formatted_source.get("citation_number", 0) > 0
+            }
+            
+            response_metadata = {
+                "chunks_retrieved": len(columns),
+                "app_id": app_id,
+                "provider": query_result.model,
+                "model": query_result.model,
+                "response_format": response_format,
+                "source_links": source_links,
+                "cache_hit": False,
+            }
+            
+            return QueryResponse.model_construct(
+                answer=answer,
+                sources=sources,
+                query_id=query_id,
+                processing_time_ms=processing_time,
+                token_usage=token_usage,
+                metadata=response_metadata
             )
         
-        # Add dashboard links to metadata
-        source_links = {}
-        if formatted_sources_metadata:
-            for formatted_source in formatted_sources_metadata:
-                citation_num = formatted_source.get("citation_number", 0)
-                if citation_num > 0:
-                    source_links[str(citation_num)] = formatted_source.get("links", {})
-        
-        response_metadata = {
-            "chunks_retrieved": len(search_results),
-            "app_id": app_id,
-            "provider": query_result.model,
-            "model": query_result.model,
-            "response_format": response_format,
-            "source_links": source_links,
+        # Generation arguments shared by the streaming and non-streaming paths
+        query_args = {
+            "query": request.query,
+            "context_chunks": context_chunks,
+            "conversation_history": None,  # TODO: Add conversation history support
         }
         
-        return QueryResponse(
-            answer=answer,
-            sources=sources,
-            query_id=query_id,
-            processing_time_ms=processing_time,
-            token_usage=token_usage,
-            metadata=response_metadata
-        )
+        if request.stream:
+            async def event_stream() -> AsyncIterator[bytes]:
+                """Forward answer tokens, then the fully formatted response."""
+                try:
+                    async for item in query_service.stream_query(**query_args):
+                        if isinstance(item, str):
+                            yield sse_event("token", {"delta": item})
+                        else:
+                            query_result = item
+                    
+                    # Citations are formatted once the full answer is known
+                    response = await build_response(query_result)
+                    query_response_cache.store(cache_scope, query_embedding, response)
+                    yield sse_event("done", response)
+                except Exception as e:
+                    # Headers are already sent, so report the failure in-stream
+                    logger.error(f"Streaming query failed: {e}", exc_info=True)
+                    background_tasks.add_task(log_query, {
+                        "id": query_id,
+                        "app_id": app_id,
+                        "user_id": user_id,
+                        "query_text": request.query,
+                        "status": "failed",
+                        "error_message": str(e),
+                        "processing_time_ms": int((time.time() - start_time) * 1000),
+                    })
+                    yield sse_event("error", {
+                        "error": "Query processing failed",
+                        "error_code": "PROCESSING_ERROR",
+                        "message": "An error occurred while processing your query. Please try again later.",
+                        "query_id": query_id,
+                    })
+            
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+        
+        # Process query with QueryService
+        query_result = await query_service.process_query(**query_args)
+        
+        response = await build_response(query_result)
+        query_response_cache.store(cache_scope, query_embedding, response)
+        
+        return PydanticResponse(response)
         
     except ValueError as e:
         # User input errors
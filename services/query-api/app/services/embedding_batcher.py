@@ -0,0 +1,113 @@
+"""
+Embedding Batcher
+
+Coalesces concurrent single-text embedding requests into batched API calls.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+EmbedBatchFn = Callable[[List[str]], Awaitable[Sequence[Any]]]
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batch coalescer for embedding requests.
+
+    Callers await `embed(text)`; a background coroutine collects requests
+    arriving within `window_ms` of the first one (up to `max_batch_size`) and
+    resolves them all from a single `embed_batch` call.
+    """
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        window_ms: int = 10,
+        max_batch_size: int = 2048
+    ):
+        """
+        Initialize embedding batcher.
+
+        Args:
+            embed_batch: Coroutine function embedding a list of texts (same order)
+            window_ms: How long to wait for more requests after the first one
+            max_batch_size: Maximum texts per batch (OpenAI allows 2048)
+        """
+        self._embed_batch = embed_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    def _ensure_worker(self) -> None:
+        """Start the collector on the running event loop if needed."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> Any:
+        """
+        Embed a single text as part of the next batch.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding vector, as returned by embed_batch
+
+        Raises:
+            Exception: If the batch embedding call fails
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Collect queued requests into batches and dispatch them."""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without blocking collection of the next batch
+            flush = self._loop.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Embed one batch and resolve its callers' futures."""
+        # Skip callers that gave up (e.g. request cancelled)
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+
+        try:
+            embeddings = await self._embed_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if len(batch) > 1:
+            logger.info(f"Embedded {len(batch)} coalesced queries in one request")
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
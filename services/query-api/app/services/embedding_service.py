@@ -5,18 +5,82 @@ Wrapper for embedding generation using the embedding service.
 """
 
 import os
+import hashlib
+import unicodedata
 import httpx
-from typing import List
+import openai
+import numpy as np
+from typing import List, Optional
+from cachetools import LRUCache
 import logging
 
+from app.services.embedding_batcher import EmbeddingBatcher
+
 logger = logging.getLogger(__name__)
 
 # Configuration
 EMBEDDING_API_URL = os.getenv("EMBEDDING_API_URL", "http://localhost:8080")  # Embedding service URL
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+EMBEDDING_BATCH_WINDOW_MS = int(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "10"))  # Coalescing window
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))  # Cached query embeddings
+
+# Embeddings of recent query texts, keyed by normalized-text SHA-256
+_EMBEDDING_CACHE: LRUCache = LRUCache(maxsize=EMBEDDING_CACHE_SIZE)
+
+# Shared client so requests reuse pooled keep-alive connections
+_client: Optional[openai.AsyncOpenAI] = None
+
+
+def _get_client() -> openai.AsyncOpenAI:
+    """Get the shared OpenAI client (created on first use)."""
+    global _client
+    if _client is None:
+        _client = openai.AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=30,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+            ),
+        )
+    return _client
 
 
-async def generate_query_embedding(query_text: str) -> List[float]:
+async def _embed_texts(texts: List[str]) -> List[np.ndarray]:
+    """
+    Embed a batch of texts in one API call.
+    
+    Args:
+        texts: Texts to embed
+        
+    Returns:
+        Unit-length float32 embedding vectors in input order
+    """
+    response = await _get_client().embeddings.create(
+        model="text-embedding-3-small",
+        input=texts,
+        dimensions=1536
+    )
+    # One array per text rather than rows of a batch matrix: each result is
+    # cached on its own, and a row view would keep the whole batch alive
+    vectors = []
+    for item in sorted(response.data, key=lambda item: item.index):
+        vector = np.asarray(item.embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) + 1e-12
+        vectors.append(vector)
+    return vectors
+
+
+# Concurrent queries share embedding API calls
+_batcher = EmbeddingBatcher(_embed_texts, window_ms=EMBEDDING_BATCH_WINDOW_MS)
+
+
+def _cache_key(text: str) -> str:
+    """Hash query text after Unicode and whitespace normalization."""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def generate_query_embedding(query_text: str) -> np.ndarray:
     """
     Generate embedding for query text.
     
@@ -24,28 +88,26 @@ async def generate_query_embedding(query_text: str) -> List[float]:
         query_text: Query text
         
     Returns:
-        Embedding vector (1536 dimensions)
+        Unit-length float32 embedding vector (1536 dimensions)
         
     Raises:
         Exception: If embedding generation fails
     """
     # For now, call OpenAI directly
     # TODO: Use embedding service API when available
-    import openai
-    
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY is required")
     
+    key = _cache_key(query_text)
+    cached = _EMBEDDING_CACHE.get(key)
+    if cached is not None:
+        return cached
+    
     try:
-        client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-        
-        response = await client.embeddings.create(
-            model="text-embedding-3-small",
-            input=query_text,
-            dimensions=1536
-        )
-        
-        return response.data[0].embedding
+        embedding = await _batcher.embed(query_text)
+        embedding.flags.writeable = False  # Shared by later requests
+        _EMBEDDING_CACHE[key] = embedding
+        return embedding
         
     except Exception as e:
         logger.error(f"Failed to generate query embedding: {e}")
@@ -5,7 +5,8 @@ Integration with OpenAI GPT-4 for answer generation.
 """
 
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
+import httpx
 import openai
 import logging
 
@@ -15,6 +16,35 @@ logger = logging.getLogger(__name__)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
 
+# Constant prompt tail, built once at import
+_INSTRUCTIONS = """
+
+Instructions:
+- Answer the question based only on the provided context
+- If the context doesn't contain enough information, say so
+- Cite sources using [Source 1], [Source 2], etc.
+- Be concise and accurate
+- If you're unsure, indicate that
+
+Answer:"""
+
+# Shared client so requests reuse pooled keep-alive connections
+_client: Optional[openai.AsyncOpenAI] = None
+
+
+def _get_client() -> openai.AsyncOpenAI:
+    """Get the shared OpenAI client (created on first use)."""
+    global _client
+    if _client is None:
+        _client = openai.AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=60,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+            ),
+        )
+    return _client
+
 
 def create_prompt(query: str, context_chunks: List[Dict]) -> str:
     """
@@ -27,29 +57,24 @@ def create_prompt(query: str, context_chunks: List[Dict]) -> str:
     Returns:
         Formatted prompt
     """
-    # Format context chunks
-    context_text = "\n\n".join([
-        f"[Source {i+1}]\n{chunk['content']}"
-        for i, chunk in enumerate(context_chunks)
-    ])
+    # Build the whole prompt with one join over a flat list of pieces
+    parts = [
+        "You are a helpful assistant that answers questions based on the provided context "
+        "from email documents and attachments.\n\nContext:\n"
+    ]
+    append = parts.append
+    for i, chunk in enumerate(context_chunks, start=1):
+        if i > 1:
+            append("\n\n")
+        append("[Source ")
+        append(str(i))
+        append("]\n")
+        append(chunk["content"])
+    append("\n\nQuestion: ")
+    append(query)
+    append(_INSTRUCTIONS)
     
-    prompt = f"""You are a helpful assistant that answers questions based on the provided context from email documents and attachments.
-
-Context:
-{context_text}
-
-Question: {query}
-
-Instructions:
-- Answer the question based only on the provided context
-- If the context doesn't contain enough information, say so
-- Cite sources using [Source 1], [Source 2], etc.
-- Be concise and accurate
-- If you're unsure, indicate that
-
-Answer:"""
-    
-    return prompt
+    return "".join(parts)
 
 
 async def generate_answer(query: str, context_chunks: List[Dict]) -> str:
@@ -70,11 +95,9 @@ async def generate_answer(query: str, context_chunks: List[Dict]) -> str:
         raise ValueError("OPENAI_API_KEY is required")
     
     try:
-        client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
-        
         prompt = create_prompt(query, context_chunks)
         
-        response = await client.chat.completions.create(
+        response = await _get_client().chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that answers questions based on provided context."},
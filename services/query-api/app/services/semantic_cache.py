@@ -0,0 +1,198 @@
+"""
+Semantic Cache
+
+In-process cache of query results keyed by query embedding similarity.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # Min cosine similarity for a hit
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))  # Per scope
+SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "1000"))  # Least recently used evicted first
+
+
+def normalize_embedding(embedding) -> np.ndarray:
+    """
+    Convert an embedding to a unit-length float32 vector.
+
+    Args:
+        embedding: Embedding vector (list or array)
+
+    Returns:
+        Contiguous float32 array with L2 norm 1
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+def top_k_cosine(
+    query: np.ndarray,
+    bank: np.ndarray,
+    k: int,
+    valid: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k rows of a normalized embedding matrix most similar to a query.
+
+    Scores are one BLAS matrix-vector product; selection uses argpartition
+    so only the k winners are sorted.
+
+    Args:
+        query: Unit-length query vector, shape (D,)
+        bank: Unit-length embeddings, shape (N, D)
+        k: Number of results
+        valid: Optional boolean mask of rows that may be returned
+
+    Returns:
+        Tuple of (row indices, cosine similarities), best first
+    """
+    scores = bank @ query
+    if valid is not None:
+        scores = np.where(valid, scores, -np.inf)
+
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+
+    top = np.argpartition(scores, -k)[-k:]
+    top = top[np.argsort(scores[top])[::-1]]
+    return top, scores[top]
+
+
+class _Scope:
+    """Cached entries for one scope, stored as a contiguous embedding matrix."""
+
+    def __init__(self, dimensions: int):
+        self.embeddings = np.empty((0, dimensions), dtype=np.float32)
+        self.created_at = np.empty(0, dtype=np.float64)
+        self.payloads: List[Any] = []
+
+    def keep(self, mask: np.ndarray) -> None:
+        """Keep only the entries selected by mask."""
+        self.embeddings = self.embeddings[mask]
+        self.created_at = self.created_at[mask]
+        self.payloads = [payload for payload, kept in zip(self.payloads, mask) if kept]
+
+
+class SemanticCache:
+    """
+    Cache returning a stored payload when a new embedding is close enough
+    (cosine similarity) to a previously stored one.
+
+    Entries are partitioned by a scope key (e.g. app_id plus request options)
+    so results never leak across tenants, and expire after a TTL. A scope is
+    removed once all its entries have expired, and the least recently used
+    scope is evicted when there are more than max_scopes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        max_scopes: int = SEMANTIC_CACHE_MAX_SCOPES,
+        dimensions: int = 1536
+    ):
+        """
+        Initialize semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            ttl_seconds: Seconds an entry stays valid
+            max_entries: Maximum entries per scope (oldest evicted first)
+            max_scopes: Maximum number of scopes (least recently used evicted first)
+            dimensions: Embedding dimensions
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.dimensions = dimensions
+        self._scopes: 'OrderedDict[Hashable, _Scope]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, scope: Hashable, embedding) -> Optional[Any]:
+        """
+        Find a cached payload for an embedding.
+
+        Args:
+            scope: Scope key the entry was stored under
+            embedding: Unit-length query embedding (see normalize_embedding)
+
+        Returns:
+            Cached payload of the most similar live entry, or None on a miss
+        """
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                return None
+            self._scopes.move_to_end(scope)
+
+            # Drop expired entries, and the scope itself once none are left
+            live = entries.created_at >= time.time() - self.ttl_seconds
+            if not live.all():
+                entries.keep(live)
+                if not entries.payloads:
+                    del self._scopes[scope]
+                    return None
+
+            indices, scores = top_k_cosine(embedding, entries.embeddings, 1)
+            if not len(indices) or scores[0] < self.threshold:
+                return None
+
+            logger.info(f"Semantic cache hit (similarity: {scores[0]:.4f})")
+            return entries.payloads[indices[0]]
+
+    def store(self, scope: Hashable, embedding, payload: Any) -> None:
+        """
+        Store a payload for an embedding.
+
+        Args:
+            scope: Scope key
+            embedding: Unit-length query embedding (see normalize_embedding)
+            payload: Value to return for similar queries
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        now = time.time()
+
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                entries = self._scopes[scope] = _Scope(self.dimensions)
+                if len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+            else:
+                self._scopes.move_to_end(scope)
+
+            # Drop expired entries, then the oldest ones if still full
+            live = entries.created_at >= now - self.ttl_seconds
+            if len(entries.payloads) >= self.max_entries:
+                live[:len(entries.payloads) - self.max_entries + 1] = False
+            if not live.all():
+                entries.keep(live)
+
+            entries.embeddings = np.vstack([entries.embeddings, vector[np.newaxis, :]])
+            entries.created_at = np.append(entries.created_at, now)
+            entries.payloads.append(payload)
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._scopes.clear()
+
+
+# Shared cache of full query responses
+query_response_cache = SemanticCache()
+
+# Shared cache of vector search results
+search_results_cache = SemanticCache()
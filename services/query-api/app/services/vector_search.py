@@ -5,10 +5,15 @@ Wrapper for vector search using Supabase.
 """
 
 import os
-from typing import List, Optional
+import numpy as np
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence
 from supabase import create_client, Client
 import logging
 
+from app.services.semantic_cache import search_results_cache
+
 logger = logging.getLogger(__name__)
 
 # Configuration
@@ -16,15 +21,72 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
 
+@dataclass(slots=True)
+class SearchColumns:
+    """Search results as parallel per-field lists (one entry per chunk)."""
+    chunk_ids: List[str]
+    email_ids: List[str]
+    attachment_ids: List[Optional[str]]
+    similarities: List[float]
+    contents: List[str]
+    
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+
+def to_columns(results: List[dict]) -> SearchColumns:
+    """
+    Split search result rows into columns in a single pass.
+    
+    Args:
+        results: Rows returned by search_similar_chunks
+        
+    Returns:
+        SearchColumns in result (similarity) order
+    """
+    columns = SearchColumns([], [], [], [], [])
+    for row in results:
+        columns.chunk_ids.append(row.get("chunk_id"))
+        columns.email_ids.append(row.get("email_id"))
+        columns.attachment_ids.append(row.get("attachment_id"))
+        columns.similarities.append(row.get("similarity", 0.0))
+        columns.contents.append(row.get("content") or "")
+    return columns
+
+
+# Shared client so searches reuse one HTTP connection pool
+_supabase_client: Optional[Client] = None
+
+
 def get_supabase_client() -> Client:
-    """Get Supabase client."""
-    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    """Get the shared Supabase client (created on first use)."""
+    global _supabase_client
+    if _supabase_client is None:
+        if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _supabase_client
+
+
+@lru_cache(maxsize=8)
+def _pgvector_template(dimensions: int) -> str:
+    """printf-style template for a pgvector literal of the given dimensions."""
+    return '[' + ','.join(['%.6g'] * dimensions) + ']'
+
+
+def to_pgvector(embedding: np.ndarray) -> str:
+    """
+    Format an embedding as a pgvector literal ('[x,y,...]').
+    
+    Uses one %-format over a cached template instead of str() per element.
+    Six significant digits is well within the precision of the halfvec
+    column and roughly halves the payload compared to float repr.
+    """
+    return _pgvector_template(len(embedding)) % tuple(embedding.tolist())
 
 
 async def search_similar_chunks(
-    query_embedding: List[float],
+    query_embedding: np.ndarray,
     app_id: str,
     top_k: int = 5,
     similarity_threshold: float = 0.0,
@@ -35,7 +97,7 @@ async def search_similar_chunks(
     Search for similar chunks using vector similarity.
     
     Args:
-        query_embedding: Query embedding vector
+        query_embedding: Query embedding vector (float32)
         app_id: App ID for tenant isolation
         top_k: Number of results to return
         similarity_threshold: Minimum similarity score
@@ -45,14 +107,17 @@ async def search_similar_chunks(
     Returns:
         List of search results with similarity scores
     """
-    supabase = get_supabase_client()
+    # Reuse results of a near-identical recent query with the same filters
+    cache_scope = (app_id, top_k, similarity_threshold, email_id, attachment_id)
+    cached = search_results_cache.lookup(cache_scope, query_embedding)
+    if cached is not None:
+        return list(cached)
     
-    # Convert embedding to pgvector format
-    embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
+    supabase = get_supabase_client()
     
     # Call Postgres RPC function
     result = supabase.rpc('search_similar_chunks', {
-        'query_embedding': embedding_str,
+        'query_embedding': to_pgvector(query_embedding),
         'p_app_id': app_id,
         'p_top_k': top_k,
         'p_similarity_threshold': similarity_threshold,
@@ -61,5 +126,53 @@ async def search_similar_chunks(
     }).execute()
     
     if result.data:
+        # Empty results are not cached so newly indexed documents show up
+        search_results_cache.store(cache_scope, query_embedding, result.data)
         return result.data
     return []
+
+
+async def search_similar_chunks_batch(
+    query_embeddings: Sequence[np.ndarray],
+    app_id: str,
+    top_k: int = 5,
+    similarity_threshold: float = 0.0,
+    email_id: Optional[str] = None,
+    attachment_id: Optional[str] = None
+) -> List[List[dict]]:
+    """
+    Search for similar chunks for several query embeddings in one RPC call.
+    
+    Args:
+        query_embeddings: Query embedding vectors (float32)
+        app_id: App ID for tenant isolation
+        top_k: Number of results to return per query
+        similarity_threshold: Minimum similarity score
+        email_id: Optional email ID filter
+        attachment_id: Optional attachment ID filter
+        
+    Returns:
+        One list of search results per query embedding, in input order
+    """
+    if not len(query_embeddings):
+        return []
+    
+    supabase = get_supabase_client()
+    
+    # Postgres array literal of pgvector literals: {"[...]","[...]"}
+    embeddings_array = '{' + ','.join('"' + to_pgvector(e) + '"' for e in query_embeddings) + '}'
+    
+    result = supabase.rpc('search_similar_chunks_batch', {
+        'query_embeddings': embeddings_array,
+        'p_app_id': app_id,
+        'p_top_k': top_k,
+        'p_similarity_threshold': similarity_threshold,
+        'p_email_id': email_id,
+        'p_attachment_id': attachment_id,
+    }).execute()
+    
+    # Group rows back by the position of their query embedding
+    grouped: List[List[dict]] = [[] for _ in range(len(query_embeddings))]
+    for row in result.data or []:
+        grouped[row.pop('query_index')].append(row)
+    return grouped
@@ -5,8 +5,24 @@ Utilities for formatting citations and source metadata.
 """
 
 import re
+import string
 from typing import List, Dict, Any, Optional
-from urllib.parse import urlencode
+from urllib.parse import quote_plus
+
+# "[Source N]" references as written by the LLM
+_SOURCE_REF_RE = re.compile(r'\[Source (\d+)\]')
+
+# "[N]" citations
+_CITATION_RE = re.compile(r'\[(\d+)\]')
+
+# Characters urlencode leaves unescaped (covers UUIDs)
+_SAFE_QUERY_CHARS = frozenset(string.ascii_letters + string.digits + '_.-~')
+
+
+def _query_value(value: Any) -> str:
+    """Encode a query string value, skipping quote_plus for already-safe IDs."""
+    text = str(value)
+    return text if _SAFE_QUERY_CHARS.issuperset(text) else quote_plus(text)
 
 
 def format_inline_citations(
@@ -25,13 +41,14 @@ def format_inline_citations(
     Returns:
         Answer text with inline citations formatted as [1], [2], etc.
     """
-    # Replace [Source N] with [N] citations
-    for i, source in enumerate(sources, start=1):
-        source_ref = f"[Source {i}]"
-        citation = f"[{i}]"
-        answer = answer.replace(source_ref, citation)
+    # Replace [Source N] with [N] in one pass, for N matching a source
+    count = len(sources)
     
-    return answer
+    def replace(match: re.Match) -> str:
+        number = int(match.group(1))
+        return f"[{number}]" if 1 <= number <= count else match.group(0)
+    
+    return _SOURCE_REF_RE.sub(replace, answer)
 
 
 def format_source_list(
@@ -42,6 +59,9 @@ def format_source_list(
     """
     Format source list with metadata and dashboard links.
     
+    Sources repeating an earlier chunk_id are dropped. Citation numbers keep
+    each source's position in `sources`, so they still match [N] in the answer.
+    
     Args:
         sources: List of source dictionaries
         base_url: Base URL for dashboard links (optional)
@@ -51,11 +71,19 @@ def format_source_list(
         List of formatted source dictionaries
     """
     formatted_sources = []
+    seen_chunk_ids = set()
+    app_param = _query_value(app_id) if base_url and app_id else None
     
     for i, source in enumerate(sources, start=1):
+        chunk_id = source.get("chunk_id")
+        if chunk_id:
+            if chunk_id in seen_chunk_ids:
+                continue
+            seen_chunk_ids.add(chunk_id)
+        
         formatted_source = {
             "citation_number": i,
-            "chunk_id": source.get("chunk_id"),
+            "chunk_id": chunk_id,
             "email_id": source.get("email_id"),
             "email_subject": source.get("email_subject"),
             "attachment_id": source.get("attachment_id"),
@@ -69,28 +97,25 @@ def format_source_list(
             links = {}
             
             # Link to query/document in dashboard
-            if app_id and source.get("chunk_id"):
-                query_params = {
-                    "app_id": app_id,
-                    "chunk_id": source.get("chunk_id"),
-                }
-                links["dashboard"] = f"{base_url}/documents?{urlencode(query_params)}"
+            if app_param and formatted_source["chunk_id"]:
+                links["dashboard"] = (
+                    f"{base_url}/documents?app_id={app_param}"
+                    f"&chunk_id={_query_value(formatted_source['chunk_id'])}"
+                )
             
             # Link to email if available
-            if app_id and source.get("email_id"):
-                query_params = {
-                    "app_id": app_id,
-                    "email_id": source.get("email_id"),
-                }
-                links["email"] = f"{base_url}/documents/email?{urlencode(query_params)}"
+            if app_param and formatted_source["email_id"]:
+                links["email"] = (
+                    f"{base_url}/documents/email?app_id={app_param}"
+                    f"&email_id={_query_value(formatted_source['email_id'])}"
+                )
             
             # Link to attachment if available
-            if app_id and source.get("attachment_id"):
-                query_params = {
-                    "app_id": app_id,
-                    "attachment_id": source.get("attachment_id"),
-                }
-                links["attachment"] = f"{base_url}/documents/attachment?{urlencode(query_params)}"
+            if app_param and formatted_source["attachment_id"]:
+                links["attachment"] = (
+                    f"{base_url}/documents/attachment?app_id={app_param}"
+                    f"&attachment_id={_query_value(formatted_source['attachment_id'])}"
+                )
             
             formatted_source["links"] = links
         
@@ -138,9 +163,7 @@ def extract_citations_from_answer(answer: str) -> List[int]:
         List of citation numbers found in answer
     """
     # Find all [N] patterns
-    pattern = r'\[(\d+)\]'
-    matches = re.findall(pattern, answer)
-    return [int(m) for m in matches]
+    return list(map(int, _CITATION_RE.findall(answer)))
 
 
 def format_html_response(
@@ -161,28 +184,25 @@ def format_html_response(
     Returns:
         HTML formatted response
     """
-    # Format answer with citation links
-    html_answer = answer
+    # Render each citation's markup once, then substitute in one pass
+    rendered = {}
     for i, source in enumerate(sources, start=1):
-        citation = f"[{i}]"
         if base_url and app_id and source.get("chunk_id"):
             link = f"{base_url}/documents?app_id={app_id}&chunk_id={source.get('chunk_id')}"
-            html_answer = html_answer.replace(
-                citation,
-                f'<a href="{link}" class="citation-link">[{i}]</a>'
-            )
+            rendered[i] = f'<a href="{link}" class="citation-link">[{i}]</a>'
         else:
-            html_answer = html_answer.replace(
-                citation,
-                f'<span class="citation">[{i}]</span>'
-            )
+            rendered[i] = f'<span class="citation">[{i}]</span>'
+    
+    html_answer = _CITATION_RE.sub(
+        lambda match: rendered.get(int(match.group(1)), match.group(0)),
+        answer
+    )
     
     # Format sources list
-    sources_html = "<ol class='sources-list'>"
-    for i, source in enumerate(sources, start=1):
-        source_desc = format_source_description(source)
-        sources_html += f"<li><strong>[{i}]</strong> {source_desc}</li>"
-    sources_html += "</ol>"
+    sources_html = "<ol class='sources-list'>" + "".join(
+        f"<li><strong>[{i}]</strong> {format_source_description(source)}</li>"
+        for i, source in enumerate(sources, start=1)
+    ) + "</ol>"
     
     return f"""
     <div class="query-response">
@@ -5,13 +5,20 @@ Error handling and formatting for the API.
 """
 
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Status and error code per exception type (subclasses match via the MRO)
+_ERROR_STATUS = {
+    ValueError: (400, "VALIDATION_ERROR"),
+    PermissionError: (403, "PERMISSION_DENIED"),
+    FileNotFoundError: (404, "NOT_FOUND"),
+}
 
-def handle_error(error: Exception, request: Request) -> JSONResponse:
+
+def handle_error(error: Exception, request: Request) -> ORJSONResponse:
     """
     Handle errors and return formatted error response.
     
@@ -24,21 +31,15 @@ def handle_error(error: Exception, request: Request) -> JSONResponse:
     """
     logger.error(f"Unhandled error: {error}", exc_info=True)
     
-    # Determine status code based on error type
-    status_code = 500
-    error_code = "INTERNAL_ERROR"
-    
-    if isinstance(error, ValueError):
-        status_code = 400
-        error_code = "VALIDATION_ERROR"
-    elif isinstance(error, PermissionError):
-        status_code = 403
-        error_code = "PERMISSION_DENIED"
-    elif isinstance(error, FileNotFoundError):
-        status_code = 404
-        error_code = "NOT_FOUND"
+    # Determine status code based on the most specific mapped error type
+    for error_type in type(error).__mro__:
+        if error_type in _ERROR_STATUS:
+            status_code, error_code = _ERROR_STATUS[error_type]
+            break
+    else:
+        status_code, error_code = 500, "INTERNAL_ERROR"
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={
             "error": str(error),
@@ -0,0 +1,29 @@
+"""
+Response Utilities
+
+Response classes for serializing Pydantic models directly.
+"""
+
+from typing import Any
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class PydanticResponse(Response):
+    """
+    JSON response rendered straight from a Pydantic model.
+    
+    Returning this from a route skips FastAPI's response_model validation and
+    jsonable_encoder pass; the model is serialized once by Pydantic's Rust
+    serializer (model_dump_json). Other content is encoded with orjson, matching
+    the app's default ORJSONResponse.
+    """
+    
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        """Serialize the model (or plain JSON-compatible value) to bytes."""
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
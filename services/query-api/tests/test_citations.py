@@ -0,0 +1,67 @@
+"""
+Tests for citation rewriting and source list formatting.
+
+Run from services/query-api with: python -m pytest tests
+"""
+
+from app.utils.citations import (
+    extract_citations_from_answer,
+    format_html_response,
+    format_inline_citations,
+    format_source_list,
+)
+
+
+def _sources(*chunk_ids):
+    return [
+        {"chunk_id": chunk_id, "email_id": f"email-{index}", "content": f"content {index}"}
+        for index, chunk_id in enumerate(chunk_ids, start=1)
+    ]
+
+
+def test_inline_citations_rewrite_source_references():
+    answer = "Permits expire [Source 2]. See also [Source 1] and [Source 2]."
+    
+    formatted = format_inline_citations(answer, _sources("a", "b"))
+    
+    assert formatted == "Permits expire [2]. See also [1] and [2]."
+    assert extract_citations_from_answer(formatted) == [2, 1, 2]
+
+
+def test_inline_citations_keep_references_without_a_source():
+    answer = "Known [Source 1], unknown [Source 3], zero [Source 0]."
+    
+    formatted = format_inline_citations(answer, _sources("a", "b"))
+    
+    assert formatted == "Known [1], unknown [Source 3], zero [Source 0]."
+
+
+def test_source_list_drops_repeated_chunks_and_keeps_numbers():
+    sources = _sources("a", "b", "a", None, "c", None)
+    
+    formatted = format_source_list(sources)
+    
+    # Numbers stay at each source's position, so [N] in the answer still matches
+    assert [source["citation_number"] for source in formatted] == [1, 2, 4, 5, 6]
+    assert [source["chunk_id"] for source in formatted] == ["a", "b", None, "c", None]
+
+
+def test_source_list_links_encode_values():
+    sources = [{"chunk_id": "chunk-1", "email_id": "a b&c", "attachment_id": None}]
+    
+    formatted = format_source_list(sources, base_url="https://example.com", app_id="app-1")
+    
+    assert formatted[0]["links"] == {
+        "dashboard": "https://example.com/documents?app_id=app-1&chunk_id=chunk-1",
+        "email": "https://example.com/documents/email?app_id=app-1&email_id=a+b%26c",
+    }
+
+
+def test_html_response_renders_only_known_citations():
+    answer = format_inline_citations("Yes [Source 1], not [Source 5]; literal [7].", _sources("a"))
+    
+    html = format_html_response(answer, _sources("a"))
+    
+    assert '<span class="citation">[1]</span>' in html
+    assert "[Source 5]" in html
+    assert "literal [7]" in html
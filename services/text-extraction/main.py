@@ -7,14 +7,17 @@ Triggered by Cloud Storage file upload events.
 
 import os
 import json
+import hashlib
 import logging
-from datetime import datetime
-from typing import Dict, Any
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
 from google.cloud import storage
 from supabase import create_client, Client
 
-from src.factory.text_extraction_factory import TextExtractionFactory
-from src.utils.chunking import chunk_text
+from src.factory.text_extraction_factory import get_factory
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,17 +33,60 @@ STORAGE_BUCKET = os.environ.get('STORAGE_BUCKET', 'email-attachments')
 CHUNK_SIZE = int(os.environ.get('CHUNK_SIZE', '800'))  # tokens
 CHUNK_OVERLAP = int(os.environ.get('CHUNK_OVERLAP', '200'))  # tokens
 
+# Embedding cache lookup (must match the embedding-generation model)
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'text-embedding-3-small')
+EMBEDDING_CACHE_LOOKUP_SIZE = 100  # Hashes per embedding_cache query (keeps URLs short)
+
+# Rows per document_chunks insert request (keeps request bodies bounded); chunks
+# are stored in batches of this size while the file is still being extracted
+CHUNK_INSERT_BATCH_SIZE = int(os.environ.get('CHUNK_INSERT_BATCH_SIZE', '500'))
+
+# Characters of extracted text stored on the attachment for preview
+EXTRACTED_TEXT_PREVIEW_SIZE = 10000
+
+# Downloaded files are staged here so extractors can reopen them by path
+# (memory-backed storage when the platform has it)
+TMPFS_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Threads for overlapping independent storage/database requests
+IO_WORKERS = int(os.environ.get('IO_WORKERS', '4'))
+
+# Load OCR language data during cold start instead of on the first image
+OCR_WARMUP = os.environ.get('OCR_WARMUP', 'true').lower() == 'true'
+
+
+# Reused across invocations on a warm instance
+_supabase_client: Optional[Client] = None
+_storage_client: Optional[storage.Client] = None
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS)
+
+if OCR_WARMUP:
+    # In the background, so startup isn't blocked; the first OCR call waits for it
+    _io_executor.submit(get_factory().warm_up)
+
 
 def get_supabase_client() -> Client:
-    """Get Supabase client."""
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        raise ValueError("Supabase URL and key must be set")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    """Get the shared Supabase client (created on first use)."""
+    global _supabase_client
+    if _supabase_client is None:
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            raise ValueError("Supabase URL and key must be set")
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase_client
 
 
 def get_storage_client() -> storage.Client:
-    """Get GCP Cloud Storage client."""
-    return storage.Client(project=GCP_PROJECT_ID)
+    """Get the shared GCP Cloud Storage client (created on first use)."""
+    global _storage_client
+    if _storage_client is None:
+        _storage_client = storage.Client(project=GCP_PROJECT_ID)
+    return _storage_client
+
+
+@lru_cache(maxsize=16)
+def get_bucket(storage_client: storage.Client, bucket_name: str) -> storage.Bucket:
+    """Get a Cloud Storage bucket reference (memoized per client and bucket name)."""
+    return storage_client.bucket(bucket_name)
 
 
 def download_file_from_storage(storage_client: storage.Client, storage_path: str) -> bytes:
@@ -54,17 +100,12 @@ def download_file_from_storage(storage_client: storage.Client, storage_path: str
     Returns:
         File data as bytes
     """
-    # Parse storage path
-    if storage_path.startswith('gs://'):
-        storage_path = storage_path[5:]  # Remove gs:// prefix
-    
-    parts = storage_path.split('/', 1)
-    if len(parts) != 2:
+    # Parse storage path (gs:// prefix is optional)
+    bucket_name, separator, blob_path = storage_path.removeprefix('gs://').partition('/')
+    if not separator:
         raise ValueError(f"Invalid storage path: {storage_path}")
     
-    bucket_name, blob_path = parts
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(blob_path)
+    blob = get_bucket(storage_client, bucket_name).blob(blob_path)
     
     return blob.download_as_bytes()
 
@@ -100,22 +141,57 @@ def get_attachment_info(supabase: Client, attachment_id: str) -> Dict[str, Any]:
     }
 
 
+def get_cached_embeddings(supabase: Client, content_hashes: List[str]) -> Dict[str, str]:
+    """
+    Look up embeddings already generated for identical content.
+    
+    Args:
+        supabase: Supabase client
+        content_hashes: SHA-256 hex digests of chunk contents
+        
+    Returns:
+        Mapping of content hash to embedding (pgvector literal); empty on failure
+    """
+    cached = {}
+    try:
+        for start in range(0, len(content_hashes), EMBEDDING_CACHE_LOOKUP_SIZE):
+            result = supabase.table('embedding_cache').select(
+                'content_sha256, embedding'
+            ).eq('model', EMBEDDING_MODEL).in_(
+                'content_sha256', content_hashes[start:start + EMBEDDING_CACHE_LOOKUP_SIZE]
+            ).execute()
+            for row in result.data or []:
+                cached[row['content_sha256']] = row['embedding']
+    except Exception as e:
+        # Fall back to generating embeddings for every chunk
+        logger.warning(f"Failed to read embedding cache: {e}")
+        return {}
+    
+    return cached
+
+
 def store_chunks(
     supabase: Client,
     app_id: str,
     email_id: str,
     attachment_id: str,
-    chunks: list
+    chunks: list,
+    now: Optional[str] = None
 ) -> int:
     """
     Store text chunks in database.
     
+    Chunks whose content is already in embedding_cache are stored with that
+    embedding as 'completed'; the rest are left 'pending' for the embedding
+    generation function.
+    
     Args:
         supabase: Supabase client
         app_id: App ID
         email_id: Email ID
         attachment_id: Attachment ID
         chunks: List of chunk dictionaries
+        now: ISO timestamp for processed_at (defaults to the current time)
         
     Returns:
         Number of chunks stored
@@ -123,8 +199,14 @@ def store_chunks(
     if not chunks:
         return 0
     
+    content_hashes = [hashlib.sha256(chunk['content'].encode('utf-8')).hexdigest() for chunk in chunks]
+    cached_embeddings = get_cached_embeddings(supabase, list(set(content_hashes)))
+    now = now or datetime.now(timezone.utc).isoformat()
+    
     chunk_records = []
-    for chunk in chunks:
+    for chunk, content_hash in zip(chunks, content_hashes):
+        # Bulk inserts need the same keys on every record
+        embedding = cached_embeddings.get(content_hash)
         chunk_records.append({
             'app_id': app_id,
             'email_id': email_id,
@@ -132,13 +214,38 @@ def store_chunks(
             'chunk_index': chunk['index'],
             'content': chunk['content'],
             'metadata': chunk.get('metadata', {}),
-            'status': 'pending',  # Will be updated when embeddings are generated
+            'embedding': embedding,
+            'status': 'completed' if embedding else 'pending',  # Pending until embeddings are generated
+            'processed_at': now if embedding else None,
         })
     
-    # Insert chunks in batch
-    result = supabase.table('document_chunks').insert(chunk_records).execute()
+    if cached_embeddings:
+        logger.info(f"Reused cached embeddings for {sum(1 for r in chunk_records if r['embedding'])} of {len(chunks)} chunks")
+    
+    # Insert chunks in batches
+    inserted = 0
+    for start in range(0, len(chunk_records), CHUNK_INSERT_BATCH_SIZE):
+        result = supabase.table('document_chunks').insert(
+            chunk_records[start:start + CHUNK_INSERT_BATCH_SIZE]
+        ).execute()
+        inserted += len(result.data) if result.data else 0
     
-    return len(result.data) if result.data else 0
+    return inserted
+
+
+def delete_attachment_chunks(supabase: Client, attachment_id: str) -> None:
+    """
+    Delete the stored chunks of an attachment.
+    
+    Chunks are inserted batch by batch while the file is extracted, so a run
+    that fails partway leaves some behind; deleting them before storing and on
+    failure keeps a retry or re-upload from duplicating them.
+    
+    Args:
+        supabase: Supabase client
+        attachment_id: Attachment ID
+    """
+    supabase.table('document_chunks').delete().eq('attachment_id', attachment_id).execute()
 
 
 def update_attachment_status(
@@ -147,7 +254,8 @@ def update_attachment_status(
     status: str,
     chunk_count: int = None,
     extracted_text: str = None,
-    error_message: str = None
+    error_message: str = None,
+    now: Optional[str] = None
 ) -> None:
     """
     Update attachment status and metadata.
@@ -159,18 +267,19 @@ def update_attachment_status(
         chunk_count: Number of chunks created
         extracted_text: Full extracted text (optional)
         error_message: Error message if failed
+        now: ISO timestamp for processed_at (defaults to the current time)
     """
     update_data = {
         'status': status,
-        'processed_at': datetime.utcnow().isoformat(),
+        'processed_at': now or datetime.now(timezone.utc).isoformat(),
     }
     
     if chunk_count is not None:
         update_data['chunk_count'] = chunk_count
     
     if extracted_text is not None:
-        # Store first 10000 characters of extracted text (optional, for preview)
-        update_data['extracted_text'] = extracted_text[:10000] if len(extracted_text) > 10000 else extracted_text
+        # Store the start of the extracted text (optional, for preview)
+        update_data['extracted_text'] = extracted_text[:EXTRACTED_TEXT_PREVIEW_SIZE]
     
     if error_message:
         update_data['error_message'] = error_message
@@ -178,6 +287,26 @@ def update_attachment_status(
     supabase.table('attachments').update(update_data).eq('id', attachment_id).execute()
 
 
+def strip_chunk_overlap(previous_content: str, content: str) -> str:
+    """
+    Drop the leading sentences a chunk repeats from the previous chunk.
+    
+    Args:
+        previous_content: Content of the previous chunk ('' for the first chunk)
+        content: Chunk content
+        
+    Returns:
+        Content without its overlap with the previous chunk
+    """
+    # Overlap is whole sentences, so it ends at a '\n\n' boundary; try the longest first
+    end = content.rfind('\n\n')
+    while end > 0:
+        if previous_content.endswith(content[:end]):
+            return content[end + 2:]
+        end = content.rfind('\n\n', 0, end)
+    return content
+
+
 def log_processing_result(
     supabase: Client,
     function_name: str,
@@ -187,7 +316,8 @@ def log_processing_result(
     attachment_id: str = None,
     error: str = None,
     processing_time: float = None,
-    chunk_count: int = None
+    chunk_count: int = None,
+    now: Optional[str] = None
 ) -> None:
     """
     Log processing result to processing_logs table.
@@ -202,6 +332,7 @@ def log_processing_result(
         error: Error message (optional)
         processing_time: Processing time in seconds (optional)
         chunk_count: Number of chunks created (optional)
+        now: ISO timestamp for created_at (defaults to the current time)
     """
     try:
         log_record = {
@@ -215,7 +346,7 @@ def log_processing_result(
             'metadata': {
                 'chunk_count': chunk_count,
             } if chunk_count else None,
-            'created_at': datetime.utcnow().isoformat(),
+            'created_at': now or datetime.now(timezone.utc).isoformat(),
         }
         
         supabase.table('processing_logs').insert(log_record).execute()
@@ -233,7 +364,7 @@ def extract_attachment(event, context):
         event: Cloud Storage event
         context: Cloud Function context
     """
-    start_time = datetime.utcnow()
+    start_time = datetime.now(timezone.utc)
     
     try:
         # Get file information from event
@@ -264,24 +395,69 @@ def extract_attachment(event, context):
             logger.warning(f"No app_id found for attachment {attachment_id}, skipping")
             return {'status': 'skipped', 'reason': 'no_app_id'}
         
-        # Get attachment info
-        attachment_info = get_attachment_info(supabase, attachment_id)
+        # Download the file and get attachment info while the status is updated
+        # to processing (only once the attachment is known not to be skipped)
+        download = _io_executor.submit(download_file_from_storage, storage_client, storage_path)
+        attachment_lookup = _io_executor.submit(get_attachment_info, supabase, attachment_id)
+        update_attachment_status(supabase, attachment_id, 'processing', now=start_time.isoformat())
+        # Drop chunks left by an earlier run of this attachment (retry, re-upload)
+        delete_attachment_chunks(supabase, attachment_id)
+        attachment_info = attachment_lookup.result()
         filename = attachment_info['filename']
         content_type = attachment_info['content_type']
         
-        # Update status to processing
-        update_attachment_status(supabase, attachment_id, 'processing')
+        # Wait for the download started above
+        file_data = download.result()
+        
+        # Extract and chunk text (PDFs are chunked page by page while extracting),
+        # storing chunks batch by batch. The preview is the start of the text
+        # rebuilt from the chunks (overlap removed), as the full text is never built.
+        chunk_count = 0
+        batch = []
+        preview_parts = []
+        preview_length = 0
+        previous_content = ''
         
-        # Download file from storage
-        file_data = download_file_from_storage(storage_client, storage_path)
+        # Stage the file on disk: PDF page workers reopen it by path instead of
+        # being sent the whole file's bytes
+        with tempfile.NamedTemporaryFile(dir=TMPFS_DIR) as staged_file:
+            staged_file.write(file_data)
+            staged_file.flush()
+            
+            for chunk in get_factory().extract_chunks(
+                file_data,
+                content_type,
+                filename,
+                file_path=staged_file.name,
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                preserve_sentences=True,
+                preserve_paragraphs=False
+            ):
+                if preview_length < EXTRACTED_TEXT_PREVIEW_SIZE:
+                    preview_parts.append(strip_chunk_overlap(previous_content, chunk['content']))
+                    preview_length += len(preview_parts[-1]) + 2
+                    previous_content = chunk['content']
+                
+                batch.append(chunk)
+                if len(batch) >= CHUNK_INSERT_BATCH_SIZE:
+                    chunk_count += store_chunks(supabase, app_id, email_id, attachment_id, batch)
+                    batch = []
         
-        # Extract text using factory
-        factory = TextExtractionFactory()
-        extracted_text = factory.extract_text(file_data, content_type, filename)
+        if batch:
+            chunk_count += store_chunks(supabase, app_id, email_id, attachment_id, batch)
         
-        if not extracted_text.strip():
+        if not preview_parts:
             logger.warning(f"No text extracted from {filename}")
-            update_attachment_status(supabase, attachment_id, 'completed', chunk_count=0)
+            finished_at = datetime.now(timezone.utc)
+            status_update = _io_executor.submit(
+                update_attachment_status,
+                supabase,
+                attachment_id,
+                'completed',
+                chunk_count=0,
+                now=finished_at.isoformat()
+            )
             log_processing_result(
                 supabase,
                 'extract-attachments',
@@ -289,36 +465,27 @@ def extract_attachment(event, context):
                 app_id=app_id,
                 email_id=email_id,
                 attachment_id=attachment_id,
-                processing_time=(datetime.utcnow() - start_time).total_seconds(),
-                chunk_count=0
+                processing_time=(finished_at - start_time).total_seconds(),
+                chunk_count=0,
+                now=finished_at.isoformat()
             )
+            status_update.result()
             return {'status': 'success', 'chunk_count': 0, 'reason': 'no_text'}
         
-        # Chunk text
-        chunks = chunk_text(
-            extracted_text,
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            preserve_sentences=True,
-            preserve_paragraphs=False
-        )
+        logger.info(f"Stored {chunk_count} chunks from {filename}")
         
-        logger.info(f"Created {len(chunks)} chunks from {filename}")
-        
-        # Store chunks in database
-        chunk_count = store_chunks(supabase, app_id, email_id, attachment_id, chunks)
-        
-        # Update attachment status
-        update_attachment_status(
+        # Update attachment status and log success concurrently, with one timestamp
+        finished_at = datetime.now(timezone.utc)
+        processing_time = (finished_at - start_time).total_seconds()
+        status_update = _io_executor.submit(
+            update_attachment_status,
             supabase,
             attachment_id,
             'completed',
             chunk_count=chunk_count,
-            extracted_text=extracted_text
+            extracted_text='\n\n'.join(preview_parts),
+            now=finished_at.isoformat()
         )
-        
-        # Log success
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
         log_processing_result(
             supabase,
             'extract-attachments',
@@ -327,8 +494,10 @@ def extract_attachment(event, context):
             email_id=email_id,
             attachment_id=attachment_id,
             processing_time=processing_time,
-            chunk_count=chunk_count
+            chunk_count=chunk_count,
+            now=finished_at.isoformat()
         )
+        status_update.result()
         
         logger.info(f"Successfully processed attachment {attachment_id}: {chunk_count} chunks created")
         
@@ -342,16 +511,22 @@ def extract_attachment(event, context):
     except ValueError as e:
         # Unsupported format or missing data
         logger.error(f"Validation error: {e}")
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
+        finished_at = datetime.now(timezone.utc)
+        processing_time = (finished_at - start_time).total_seconds()
         
         # Try to update attachment status if we have the ID
         try:
             if 'attachment_id' in locals():
+                delete_attachment_chunks(
+                    supabase if 'supabase' in locals() else get_supabase_client(),
+                    attachment_id
+                )
                 update_attachment_status(
                     supabase if 'supabase' in locals() else get_supabase_client(),
                     attachment_id,
                     'failed',
-                    error_message=str(e)
+                    error_message=str(e),
+                    now=finished_at.isoformat()
                 )
                 log_processing_result(
                     supabase if 'supabase' in locals() else get_supabase_client(),
@@ -359,7 +534,8 @@ def extract_attachment(event, context):
                     'failed',
                     attachment_id=attachment_id,
                     error=str(e),
-                    processing_time=processing_time
+                    processing_time=processing_time,
+                    now=finished_at.isoformat()
                 )
         except:
             pass
@@ -369,16 +545,20 @@ def extract_attachment(event, context):
     except Exception as e:
         # Unexpected error
         logger.error(f"Unexpected error processing attachment: {e}", exc_info=True)
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
+        finished_at = datetime.now(timezone.utc)
+        processing_time = (finished_at - start_time).total_seconds()
         
         # Try to log error
         try:
             if 'attachment_id' in locals() and 'supabase' in locals():
+                # Drop the chunks stored before the failure
+                delete_attachment_chunks(supabase, attachment_id)
                 update_attachment_status(
                     supabase,
                     attachment_id,
                     'failed',
-                    error_message=str(e)
+                    error_message=str(e),
+                    now=finished_at.isoformat()
                 )
                 log_processing_result(
                     supabase,
@@ -386,7 +566,8 @@ def extract_attachment(event, context):
                     'failed',
                     attachment_id=attachment_id,
                     error=str(e),
-                    processing_time=processing_time
+                    processing_time=processing_time,
+                    now=finished_at.isoformat()
                 )
         except:
             pass
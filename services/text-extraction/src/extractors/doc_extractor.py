@@ -1,38 +1,171 @@
 """
 DOC Text Extractor
 
-Extracts text from legacy DOC files using LibreOffice conversion.
+Extracts text from legacy DOC files by reading the Word 97-2003 piece table
+in-process with olefile, falling back to LibreOffice conversion.
 """
 
 import logging
+import re
+import struct
 import subprocess
 import tempfile
 import os
+from io import BytesIO
 from typing import Optional
+import olefile
 
 from ..interfaces.text_extraction_service import TextExtractionService
 
 logger = logging.getLogger(__name__)
 
+# Word 97-2003 File Information Block (FIB) layout, see [MS-DOC] 2.5
+_WORD_IDENT = 0xA5EC
+_MIN_NFIB = 0x00C1  # Word 97; older (Word 6/95) files use a different layout
+_F_ENCRYPTED = 0x0100
+_F_WHICH_TBL_STM = 0x0200
+_FC_CLX_INDEX = 33  # Position of fcClx/lcbClx in FibRgFcLcb97
+_CCP_TEXT_INDEX = 3  # Position of ccpText in FibRgLw97
+
+# Word control characters: paragraph/line/page/cell marks become whitespace,
+# special hyphens are resolved and other object anchors are dropped
+_CONTROL_CHARS = {
+    0x0D: '\n', 0x0B: '\n', 0x0C: '\n', 0x07: '\t',
+    0x1E: '-', 0x1F: None,
+    **{c: None for c in (0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x08, 0x0E, 0x0F)},
+}
+
+# Field delimiters: \x13 instruction \x14 result \x15
+_FIELD_RE = re.compile('[\x13\x14\x15]')
+
+# Stage LibreOffice input in memory-backed storage when the platform has it
+_TMPFS_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def _strip_fields(text: str) -> str:
+    """Keep field results (e.g. hyperlink text) and drop field instructions."""
+    if '\x13' not in text:
+        return text
+    
+    parts = []
+    stack = []  # One entry per open field: True while in its instruction
+    position = 0
+    for match in _FIELD_RE.finditer(text):
+        if not any(stack):
+            parts.append(text[position:match.start()])
+        mark = match.group()
+        if mark == '\x13':
+            stack.append(True)
+        elif mark == '\x14' and stack:
+            stack[-1] = False
+        elif mark == '\x15' and stack:
+            stack.pop()
+        position = match.end()
+    if not any(stack):
+        parts.append(text[position:])
+    return ''.join(parts)
+
+
+def read_word_document_text(file_data: bytes) -> str:
+    """
+    Read the main document text of a Word 97-2003 file from its piece table.
+    
+    Args:
+        file_data: DOC file data as bytes
+        
+    Returns:
+        Main document text with Word control characters normalized
+        
+    Raises:
+        ValueError: If the file is not an unencrypted Word 97+ document
+    """
+    with olefile.OleFileIO(BytesIO(file_data)) as ole:
+        word_document = ole.openstream('WordDocument').read()
+        
+        ident, nfib = struct.unpack_from('<HH', word_document, 0)
+        flags, = struct.unpack_from('<H', word_document, 0x0A)
+        if ident != _WORD_IDENT or nfib < _MIN_NFIB:
+            raise ValueError("Not a Word 97-2003 document")
+        if flags & _F_ENCRYPTED:
+            raise ValueError("Encrypted DOC files are not supported")
+        
+        table_stream = '1Table' if flags & _F_WHICH_TBL_STM else '0Table'
+        table = ole.openstream(table_stream).read()
+    
+    # FibBase (32 bytes), then the variable-length FibRgW, FibRgLw and FibRgFcLcb
+    offset = 32
+    csw, = struct.unpack_from('<H', word_document, offset)
+    offset += 2 + csw * 2
+    cslw, = struct.unpack_from('<H', word_document, offset)
+    ccp_text, = struct.unpack_from('<i', word_document, offset + 2 + _CCP_TEXT_INDEX * 4)
+    offset += 2 + cslw * 4
+    fc_clx, lcb_clx = struct.unpack_from('<II', word_document, offset + 2 + _FC_CLX_INDEX * 8)
+    
+    # Clx: skip formatting (Prc, 0x01) records up to the piece table (Pcdt, 0x02)
+    clx = table[fc_clx:fc_clx + lcb_clx]
+    position = 0
+    while position < len(clx) and clx[position] == 0x01:
+        cb_grpprl, = struct.unpack_from('<H', clx, position + 1)
+        position += 3 + cb_grpprl
+    if position >= len(clx) or clx[position] != 0x02:
+        raise ValueError("DOC piece table not found")
+    lcb, = struct.unpack_from('<I', clx, position + 1)
+    plc = clx[position + 5:position + 5 + lcb]
+    
+    # PlcPcd: n + 1 character positions followed by n 8-byte piece descriptors
+    count = (lcb - 4) // 12
+    cps = struct.unpack_from(f'<{count + 1}i', plc, 0)
+    pieces = []
+    remaining = ccp_text
+    for i in range(count):
+        if remaining <= 0:
+            break
+        length = min(cps[i + 1] - cps[i], remaining)
+        fc, = struct.unpack_from('<I', plc, (count + 1) * 4 + i * 8 + 2)
+        if fc & 0x40000000:
+            # Compressed piece: one cp1252 byte per character
+            start = (fc & ~0x40000000) // 2
+            pieces.append(word_document[start:start + length].decode('cp1252', errors='replace'))
+        else:
+            pieces.append(word_document[fc:fc + length * 2].decode('utf-16-le', errors='replace'))
+        remaining -= length
+    
+    return _strip_fields(''.join(pieces)).translate(_CONTROL_CHARS)
+
 
 class DOCExtractor(TextExtractionService):
-    """DOC text extraction using LibreOffice conversion."""
+    """
+    DOC text extraction.
+    
+    Reads Word 97-2003 text in-process; LibreOffice conversion is only used
+    for files the piece-table reader cannot handle (e.g. Word 6/95, encrypted).
+    """
+
+    SUPPORTED_FORMATS = frozenset({'application/msword'})
+    SUPPORTED_EXTENSIONS = ('.doc',)
 
     def supports_format(self, content_type: str, filename: Optional[str] = None) -> bool:
         """Check if file is a DOC file."""
         return (
-            content_type == 'application/msword' or
-            (filename and filename.lower().endswith('.doc'))
+            content_type.lower() in self.SUPPORTED_FORMATS or
+            (filename and filename.lower().endswith(self.SUPPORTED_EXTENSIONS))
         )
 
-    def extract_text(self, file_data: bytes, content_type: str, filename: Optional[str] = None) -> str:
+    def extract_text(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> str:
         """
-        Extract text from DOC file by converting to text using LibreOffice.
+        Extract text from DOC file.
         
         Args:
             file_data: DOC file data as bytes
             content_type: MIME type (should be "application/msword")
             filename: Optional filename
+            file_path: Optional path of the file on disk (unused)
             
         Returns:
             Extracted text
@@ -44,57 +177,48 @@ class DOCExtractor(TextExtractionService):
             raise ValueError(f"Unsupported format: {content_type}")
         
         try:
-            # Create temporary files
-            with tempfile.NamedTemporaryFile(suffix='.doc', delete=False) as input_file:
-                input_file.write(file_data)
-                input_file_path = input_file.name
+            return read_word_document_text(file_data)
+        except Exception as e:
+            logger.info(f"In-process DOC read failed ({e}), falling back to LibreOffice")
+        
+        return self._convert_with_libreoffice(file_data)
+
+    def _convert_with_libreoffice(self, file_data: bytes) -> str:
+        """
+        Extract text from DOC file using LibreOffice.
+        
+        The file is staged in a tmpfs directory when available and the text is
+        read from LibreOffice's stdout (--cat), so no output file is written.
+        
+        Args:
+            file_data: DOC file data as bytes
             
-            output_dir = tempfile.mkdtemp()
-            output_file_path = os.path.join(output_dir, 'output.txt')
+        Returns:
+            Extracted text
             
-            try:
-                # Convert DOC to TXT using LibreOffice
-                # libreoffice --headless --convert-to txt --outdir <output_dir> <input_file>
+        Raises:
+            ValueError: If conversion fails
+        """
+        try:
+            with tempfile.TemporaryDirectory(dir=_TMPFS_DIR) as work_dir:
+                input_file_path = os.path.join(work_dir, 'input.doc')
+                with open(input_file_path, 'wb') as input_file:
+                    input_file.write(file_data)
+                
+                # libreoffice --headless --cat <input_file>
                 result = subprocess.run(
                     [
                         'libreoffice',
                         '--headless',
-                        '--convert-to', 'txt',
-                        '--outdir', output_dir,
+                        '--cat',
                         input_file_path
                     ],
                     capture_output=True,
                     timeout=60,
                     check=True
                 )
-                
-                # Read converted text file
-                if os.path.exists(output_file_path):
-                    with open(output_file_path, 'r', encoding='utf-8') as f:
-                        text = f.read()
-                else:
-                    # Try to find the output file (LibreOffice may change the name)
-                    txt_files = [f for f in os.listdir(output_dir) if f.endswith('.txt')]
-                    if txt_files:
-                        with open(os.path.join(output_dir, txt_files[0]), 'r', encoding='utf-8') as f:
-                            text = f.read()
-                    else:
-                        raise ValueError("LibreOffice conversion did not produce output file")
-                
-                return text
-                
-            finally:
-                # Cleanup
-                try:
-                    os.unlink(input_file_path)
-                except:
-                    pass
-                try:
-                    for f in os.listdir(output_dir):
-                        os.unlink(os.path.join(output_dir, f))
-                    os.rmdir(output_dir)
-                except:
-                    pass
+            
+            return result.stdout.decode('utf-8', errors='replace')
                     
         except subprocess.TimeoutExpired:
             logger.error("LibreOffice conversion timed out")
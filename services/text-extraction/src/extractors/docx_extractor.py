@@ -1,30 +1,137 @@
 """
 DOCX Text Extractor
 
-Extracts text from DOCX files using python-docx.
+Extracts text from DOCX files by streaming word/document.xml with lxml.
 """
 
 import logging
-from typing import Optional
+import zipfile
+from typing import IO, List, Optional
 from io import BytesIO
-from docx import Document
+from lxml import etree
 
 from ..interfaces.text_extraction_service import TextExtractionService
 
 logger = logging.getLogger(__name__)
 
+# WordprocessingML element tags
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_P = _W + 'p'
+_R = _W + 'r'
+_T = _W + 't'
+_TAB = _W + 'tab'
+_BR = _W + 'br'
+_CR = _W + 'cr'
+_TBL = _W + 'tbl'
+_TR = _W + 'tr'
+_TC = _W + 'tc'
+
+
+def _release(element: etree._Element) -> None:
+    """Free a fully parsed element and its already parsed preceding siblings."""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _read_paragraphs(document_xml: IO[bytes]) -> List[str]:
+    """
+    Read the text of body paragraphs and table rows from word/document.xml.
+    
+    The XML is parsed as a stream of events, and each paragraph, cell, row
+    and table is freed (with its parsed preceding siblings) once its text is
+    taken, so memory stays bounded by the element being parsed.
+    
+    Args:
+        document_xml: word/document.xml file object
+        
+    Returns:
+        Non-empty paragraph texts, followed by table rows (cells joined with ' | ')
+    """
+    paragraphs: List[str] = []
+    table_rows: List[str] = []
+    
+    # Text runs of the paragraphs being parsed (textboxes nest paragraphs)
+    paragraph_stack: List[List[str]] = []
+    cell_paragraphs: List[str] = []
+    row_cells: List[str] = []
+    table_depth = 0
+    
+    for event, element in etree.iterparse(document_xml, events=('start', 'end')):
+        tag = element.tag
+        
+        if event == 'start':
+            if tag == _P:
+                paragraph_stack.append([])
+            elif tag == _TBL:
+                table_depth += 1
+            continue
+        
+        if tag == _T:
+            if paragraph_stack and element.text:
+                paragraph_stack[-1].append(element.text)
+        elif tag == _TAB:
+            # Tab stop definitions in paragraph properties are also w:tab
+            if paragraph_stack and element.getparent().tag == _R:
+                paragraph_stack[-1].append('\t')
+        elif tag == _BR or tag == _CR:
+            if paragraph_stack:
+                paragraph_stack[-1].append('\n')
+        elif tag == _P:
+            text = ''.join(paragraph_stack.pop())
+            if table_depth == 0:
+                if text and not text.isspace():
+                    paragraphs.append(text)
+            elif table_depth == 1:
+                cell_paragraphs.append(text)
+            _release(element)
+        elif tag == _TC and table_depth == 1:
+            cell_text = '\n'.join(cell_paragraphs).strip()
+            if cell_text:
+                row_cells.append(cell_text)
+            cell_paragraphs = []
+            _release(element)
+        elif tag == _TR and table_depth == 1:
+            if row_cells:
+                table_rows.append(' | '.join(row_cells))
+            row_cells = []
+            _release(element)
+        elif tag == _TBL:
+            table_depth -= 1
+            _release(element)
+    
+    # Paragraphs first, then table rows
+    paragraphs.extend(table_rows)
+    return paragraphs
+
 
 class DOCXExtractor(TextExtractionService):
-    """DOCX text extraction using python-docx."""
+    """
+    DOCX text extraction using lxml iterparse.
+
+    Parses the document body as a stream of XML events instead of building
+    python-docx's object model, so no element tree is kept for large documents.
+    """
+
+    SUPPORTED_FORMATS = frozenset({'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+    SUPPORTED_EXTENSIONS = ('.docx',)
 
     def supports_format(self, content_type: str, filename: Optional[str] = None) -> bool:
         """Check if file is a DOCX."""
         return (
-            content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or
-            (filename and filename.lower().endswith('.docx'))
+            content_type.lower() in self.SUPPORTED_FORMATS or
+            (filename and filename.lower().endswith(self.SUPPORTED_EXTENSIONS))
         )
 
-    def extract_text(self, file_data: bytes, content_type: str, filename: Optional[str] = None) -> str:
+    def extract_text(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> str:
         """
         Extract text from DOCX file.
         
@@ -32,10 +139,11 @@ class DOCXExtractor(TextExtractionService):
             file_data: DOCX file data as bytes
             content_type: MIME type
             filename: Optional filename
-            
+            file_path: Optional path of the file on disk; opened directly instead of file_data
+        
         Returns:
             Extracted text from paragraphs and tables
-            
+        
         Raises:
             ValueError: If file is not a DOCX or is corrupted
         """
@@ -43,34 +151,17 @@ class DOCXExtractor(TextExtractionService):
             raise ValueError(f"Unsupported format: {content_type}")
         
         try:
-            # Open DOCX from bytes
-            doc = Document(BytesIO(file_data))
-            
-            text_parts = []
+            with zipfile.ZipFile(file_path or BytesIO(file_data)) as docx:
+                with docx.open('word/document.xml') as document_xml:
+                    paragraphs = _read_paragraphs(document_xml)
             
-            # Extract text from paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_parts.append(paragraph.text)
+            full_text = '\n\n'.join(paragraphs)
             
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        text_parts.append(' | '.join(row_text))
-            
-            # Join all parts with newlines
-            full_text = '\n\n'.join(text_parts)
-            
-            if not full_text.strip():
+            if not paragraphs:
                 logger.warning(f"DOCX {filename or 'unknown'} appears to be empty")
             
             return full_text
-            
+        
         except Exception as e:
             logger.error(f"Failed to extract text from DOCX: {e}")
             raise ValueError(f"Failed to extract text from DOCX: {str(e)}")
@@ -1,40 +1,161 @@
 """
 Image OCR Text Extractor
 
-Extracts text from images using pytesseract OCR.
+Extracts text from images using the in-process Tesseract API (tesserocr).
 """
 
 import logging
-from typing import Optional
+import os
+import threading
+from typing import List, Optional, Tuple
 from io import BytesIO
-from PIL import Image
-import pytesseract
+from PIL import Image, ImageOps
+
+# Tesseract's OpenMP threads contend with process-level parallelism and are
+# slower than single-threaded OCR; must be set before tesseract is loaded
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+from tesserocr import PyTessBaseAPI
 
 from ..interfaces.text_extraction_service import TextExtractionService
 
 logger = logging.getLogger(__name__)
 
+# Images whose longer side is below this many pixels are upscaled 3x before OCR
+OCR_UPSCALE_BELOW_PX = int(os.environ.get('OCR_UPSCALE_BELOW_PX', '1000'))
+
+# Images whose longer side is over 1.2x this many pixels are downscaled to it before
+# OCR (Tesseract gains nothing from more pixels; its run time grows with them)
+OCR_MAX_DIM = int(os.environ.get('OCR_MAX_DIM', '2000'))
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """
+    Compute the Otsu binarization threshold of a grayscale histogram.
+    
+    Args:
+        histogram: 256-bin grayscale histogram
+        
+    Returns:
+        Threshold maximizing between-class variance
+    """
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    
+    background_count = 0
+    background_weighted = 0
+    best_threshold = 127
+    best_variance = -1.0
+    
+    for level, count in enumerate(histogram):
+        background_count += count
+        foreground_count = total - background_count
+        if background_count == 0:
+            continue
+        if foreground_count == 0:
+            break
+        
+        background_weighted += level * count
+        background_mean = background_weighted / background_count
+        foreground_mean = (weighted_total - background_weighted) / foreground_count
+        variance = background_count * foreground_count * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = level
+    
+    return best_threshold
+
+
+def _downscaled_size(size: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    """
+    Get the size to downscale an image to before OCR.
+    
+    Args:
+        size: Image (width, height)
+        
+    Returns:
+        Size with the longer side at OCR_MAX_DIM, or None if no downscale is needed
+    """
+    width, height = size
+    longest = max(width, height)
+    if longest <= OCR_MAX_DIM * 1.2:
+        return None
+    return max(1, width * OCR_MAX_DIM // longest), max(1, height * OCR_MAX_DIM // longest)
+
+
+def _preprocess(image: Image.Image) -> Image.Image:
+    """
+    Prepare an image for OCR: grayscale, downscale very large and upscale
+    small images, contrast stretch and binarize with Otsu's threshold.
+    
+    Args:
+        image: Decoded image
+        
+    Returns:
+        Bilevel (mode '1') image
+    """
+    # Flatten transparency onto white so transparent areas don't turn black
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        image = Image.alpha_composite(Image.new('RGBA', image.size, 'white'), image.convert('RGBA'))
+    
+    image = image.convert('L')
+    
+    downscaled_size = _downscaled_size(image.size)
+    if downscaled_size:
+        image = image.resize(downscaled_size, Image.LANCZOS)
+    
+    image = ImageOps.autocontrast(image)
+    
+    width, height = image.size
+    if max(width, height) < OCR_UPSCALE_BELOW_PX:
+        image = image.resize((width * 3, height * 3), Image.LANCZOS)
+    
+    threshold = _otsu_threshold(image.histogram())
+    return image.point(lambda level: 255 if level > threshold else 0, '1')
+
 
 class ImageExtractor(TextExtractionService):
-    """Image OCR text extraction using pytesseract."""
+    """
+    Image OCR text extraction using tesserocr.
+
+    One Tesseract API instance is kept per extractor, so language data is
+    loaded once instead of starting a tesseract process per image.
+    """
 
-    SUPPORTED_FORMATS = {
+    SUPPORTED_FORMATS = frozenset({
         'image/png',
         'image/jpeg',
         'image/jpg',
         'image/gif',
         'image/bmp',
         'image/tiff',
-    }
+    })
+    SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff')
+
+    def __init__(self):
+        """Initialize extractor (the Tesseract API is created on first use)."""
+        self._api: Optional[PyTessBaseAPI] = None
+        self._lock = threading.Lock()
+
+    def __del__(self):
+        """Release the Tesseract API."""
+        if getattr(self, '_api', None) is not None:
+            self._api.End()
 
     def supports_format(self, content_type: str, filename: Optional[str] = None) -> bool:
         """Check if file is a supported image format."""
         return (
             content_type.lower() in self.SUPPORTED_FORMATS or
-            (filename and any(filename.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff']))
+            (filename and filename.lower().endswith(self.SUPPORTED_EXTENSIONS))
         )
 
-    def extract_text(self, file_data: bytes, content_type: str, filename: Optional[str] = None) -> str:
+    def extract_text(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> str:
         """
         Extract text from image using OCR.
         
@@ -42,6 +163,7 @@ class ImageExtractor(TextExtractionService):
             file_data: Image file data as bytes
             content_type: MIME type (e.g., "image/png")
             filename: Optional filename
+            file_path: Optional path of the file on disk (unused)
             
         Returns:
             Extracted text from image
@@ -53,17 +175,85 @@ class ImageExtractor(TextExtractionService):
             raise ValueError(f"Unsupported format: {content_type}")
         
         try:
-            # Open image from bytes
-            image = Image.open(BytesIO(file_data))
-            
-            # Perform OCR
-            text = pytesseract.image_to_string(image)
+            text = self._recognize([self._open_image(file_data)])[0]
             
-            if not text.strip():
+            if not text:
                 logger.warning(f"Image {filename or 'unknown'} appears to contain no text")
             
-            return text.strip()
+            return text
             
         except Exception as e:
             logger.error(f"Failed to extract text from image: {e}")
             raise ValueError(f"Failed to extract text from image: {str(e)}")
+
+    def warm_up(self) -> None:
+        """
+        Create the Tesseract API and run it once on a blank image, so language
+        data and recognizer state are loaded before the first real image.
+        """
+        try:
+            self._recognize([Image.new('1', (32, 32), 1)])
+        except Exception as e:
+            logger.warning(f"OCR warm-up failed: {e}")
+
+    def extract_text_many(self, items: List[Tuple[bytes, str]]) -> List[str]:
+        """
+        Extract text from several images in one Tesseract API session.
+        
+        Images are decoded first, then recognized back to back under a single
+        lock acquisition on the already-initialized API.
+        
+        Args:
+            items: List of (file_data, content_type) tuples
+            
+        Returns:
+            Extracted text for each image, in input order
+            
+        Raises:
+            ValueError: If an item is not a supported image format or OCR fails
+        """
+        for _, content_type in items:
+            if not self.supports_format(content_type):
+                raise ValueError(f"Unsupported format: {content_type}")
+        
+        try:
+            return self._recognize([self._open_image(file_data) for file_data, _ in items])
+        except Exception as e:
+            logger.error(f"Failed to extract text from images: {e}")
+            raise ValueError(f"Failed to extract text from images: {str(e)}")
+
+    def recognize_images(self, images: List[Image.Image]) -> List[str]:
+        """
+        Run OCR on already-decoded images (e.g. rendered PDF pages).
+        
+        Args:
+            images: PIL images
+            
+        Returns:
+            Extracted text for each image, in input order
+        """
+        return self._recognize([_preprocess(image) for image in images])
+
+    def _open_image(self, file_data: bytes) -> Image.Image:
+        """Decode image bytes and preprocess them for OCR."""
+        image = Image.open(BytesIO(file_data))
+        # Have libjpeg decode color JPEGs straight to grayscale (skips the RGB
+        # conversion and the later RGB -> L pass) and, for very large JPEGs, at a
+        # reduced scale no smaller than the OCR size; no-op for other formats
+        image.draft('L', _downscaled_size(image.size))
+        return _preprocess(image)
+
+    def _recognize(self, images: List[Image.Image]) -> List[str]:
+        """Run OCR on preprocessed (mode '1') images with the shared API (which is not thread-safe)."""
+        texts = []
+        with self._lock:
+            if self._api is None:
+                self._api = PyTessBaseAPI(lang='eng')
+            for image in images:
+                # Hand Tesseract the packed pixels directly (MSB first, 1 = white, as
+                # PIL stores mode '1'); SetImage would encode a BMP for Leptonica to
+                # decode again. Tesseract copies the bytes into its own Leptonica Pix,
+                # so the buffer need not outlive the call.
+                self._api.SetImageBytes(image.tobytes(), image.width, image.height, 0, (image.width + 7) // 8)
+                texts.append(self._api.GetUTF8Text().strip())
+        return texts
@@ -1,36 +1,170 @@
 """
 PDF Text Extractor
 
-Extracts text from PDF files using PyMuPDF (fitz).
+Extracts text from PDF files using PyMuPDF (fitz), with OCR for scanned PDFs.
 """
 
 import logging
-from typing import Optional
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 import fitz  # PyMuPDF
+from PIL import Image
 
 from ..interfaces.text_extraction_service import TextExtractionService
+from ..utils.chunking import ChunkAccumulator
+from .image_extractor import ImageExtractor
 
 logger = logging.getLogger(__name__)
 
+# Page extraction runs in worker processes; MuPDF holds the GIL while extracting
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', str(min(os.cpu_count() or 1, 4))))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', '4'))  # Smaller PDFs stay sequential
+
+# Pages without a text layer (scans, outlined text) are rendered at this resolution and OCR'd
+PDF_OCR_DPI = int(os.environ.get('PDF_OCR_DPI', '200'))
+
+# Plain text extraction: ligatures expanded, whitespace normalized, text outside
+# the page clipped (skips the ligature/whitespace preservation of the defaults),
+# and words hyphenated across line breaks rejoined by MuPDF
+_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_CID_FOR_UNKNOWN_UNICODE | fitz.TEXT_DEHYPHENATE
+
+# PyMuPDF is not thread-safe: in-process MuPDF calls are serialized with this lock,
+# held for one page at a time (never while a caller consumes results)
+_fitz_lock = threading.Lock()
+
+# Page-range worker processes, kept for the life of the instance. Started with
+# forkserver: the service runs threads (I/O pool, OCR warm-up), and forking a
+# multithreaded process without exec can deadlock the child.
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+# OCR engine of a page worker process (created on first use). Workers are separate
+# processes, so each loads its own Tesseract data and the service warm-up doesn't
+# reach them; pages extracted in-process use the extractor's shared ImageExtractor.
+_worker_image_extractor: Optional[ImageExtractor] = None
+
+
+def _open_pdf(source: Union[str, bytes]) -> fitz.Document:
+    """Open a PDF from a path on disk or from bytes."""
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Get the page-range worker pool (created on first use)."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+        return _page_pool
+
+
+def _reset_page_pool() -> None:
+    """Drop a broken worker pool so the next PDF starts a new one."""
+    global _page_pool
+    with _page_pool_lock:
+        _page_pool = None
+
+
+def _read_page(doc: fitz.Document, page_num: int) -> Tuple[str, Optional[Image.Image]]:
+    """
+    Extract the text layer of a page, or render the page if it has none.
+    
+    Pages whose text layer is empty but that have content (a scanned image,
+    text drawn as outlines) need OCR; blank pages don't.
+    
+    Args:
+        doc: Open PDF document
+        page_num: Page number
+        
+    Returns:
+        Tuple of (page text, grayscale page image to OCR or None)
+    """
+    page = doc[page_num]
+    text = page.get_text("text", flags=_TEXT_FLAGS)
+    if text.strip() or not page.get_contents():
+        return text, None
+    
+    pixmap = page.get_pixmap(dpi=PDF_OCR_DPI, colorspace=fitz.csGRAY)
+    return text, Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def _extract_page_range(source: Union[str, bytes], start: int, stop: int) -> List[str]:
+    """
+    Extract text from a range of pages, OCR'ing pages without a text layer
+    (runs in a worker process).
+    
+    Args:
+        source: Path of the PDF on disk, or the PDF bytes
+        start: First page number
+        stop: Page number after the last page
+        
+    Returns:
+        Text of each page in the range
+    """
+    global _worker_image_extractor
+    
+    texts = []
+    with _open_pdf(source) as doc:
+        for page_num in range(start, stop):
+            text, scan = _read_page(doc, page_num)
+            if scan is not None:
+                if _worker_image_extractor is None:
+                    _worker_image_extractor = ImageExtractor()
+                text = _worker_image_extractor.recognize_images([scan])[0]
+            texts.append(text)
+    return texts
+
 
 class PDFExtractor(TextExtractionService):
     """PDF text extraction using PyMuPDF."""
 
+    SUPPORTED_FORMATS = frozenset({'application/pdf'})
+    SUPPORTED_EXTENSIONS = ('.pdf',)
+
+    def __init__(self, image_extractor: Optional[ImageExtractor] = None):
+        """
+        Initialize extractor.
+        
+        Args:
+            image_extractor: OCR engine for pages without a text layer (share the
+                factory's ImageExtractor so its warm-up and Tesseract data are reused)
+        """
+        self._image_extractor = image_extractor or ImageExtractor()
+
     def supports_format(self, content_type: str, filename: Optional[str] = None) -> bool:
         """Check if file is a PDF."""
         return (
-            content_type == 'application/pdf' or
-            (filename and filename.lower().endswith('.pdf'))
+            content_type.lower() in self.SUPPORTED_FORMATS or
+            (filename and filename.lower().endswith(self.SUPPORTED_EXTENSIONS))
         )
 
-    def extract_text(self, file_data: bytes, content_type: str, filename: Optional[str] = None) -> str:
+    def extract_text(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> str:
         """
         Extract text from PDF file.
         
+        Pages without a text layer (e.g. scanned pages) are rendered and OCR'd;
+        the text layer of every other page is kept.
+        
         Args:
             file_data: PDF file data as bytes
             content_type: MIME type (should be "application/pdf")
             filename: Optional filename
+            file_path: Optional path of the PDF on disk; opened directly instead of file_data
             
         Returns:
             Extracted text from all pages
@@ -42,22 +176,9 @@ class PDFExtractor(TextExtractionService):
             raise ValueError(f"Unsupported format: {content_type}")
         
         try:
-            # Open PDF from bytes
-            doc = fitz.open(stream=file_data, filetype="pdf")
-            
-            text_parts = []
-            
-            # Extract text from each page
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                if text:
-                    text_parts.append(text)
-            
-            doc.close()
-            
-            # Join all pages with newlines
-            full_text = '\n\n'.join(text_parts)
+            # Join all non-empty pages with newlines
+            page_texts = self._iter_page_texts(file_path or file_data, filename)
+            full_text = '\n\n'.join(text for text in page_texts if text)
             
             if not full_text.strip():
                 logger.warning(f"PDF {filename or 'unknown'} appears to be empty or image-based")
@@ -67,3 +188,107 @@ class PDFExtractor(TextExtractionService):
         except Exception as e:
             logger.error(f"Failed to extract text from PDF: {e}")
             raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+    def extract_chunks(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None,
+        chunk_size: int = 800,
+        chunk_overlap: int = 200,
+        preserve_sentences: bool = True,
+        preserve_paragraphs: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Extract text from PDF file and yield chunks while pages are extracted.
+        
+        Pages are fed to the chunker as they arrive, so the full text is never
+        built. Chunks are the same as chunk_text on the extract_text result.
+        The document stays open until the generator is exhausted or closed,
+        but no lock is held while the caller consumes chunks.
+        
+        Args:
+            file_data: PDF file data as bytes
+            content_type: MIME type (should be "application/pdf")
+            filename: Optional filename
+            file_path: Optional path of the PDF on disk; opened directly instead of file_data
+            chunk_size: Target chunk size in tokens
+            chunk_overlap: Overlap between chunks in tokens
+            preserve_sentences: Try to preserve sentence boundaries
+            preserve_paragraphs: Try to preserve paragraph boundaries
+            
+        Yields:
+            Chunk dictionaries with 'content', 'index', and 'metadata'
+            
+        Raises:
+            ValueError: If file is not a PDF or is corrupted
+        """
+        if not self.supports_format(content_type, filename):
+            raise ValueError(f"Unsupported format: {content_type}")
+        
+        accumulator = ChunkAccumulator(chunk_size, chunk_overlap, preserve_sentences, preserve_paragraphs)
+        try:
+            # Empty pages are skipped, as in the extract_text join
+            for text in self._iter_page_texts(file_path or file_data, filename):
+                if text:
+                    accumulator.add_text(text)
+                    yield from accumulator.drain()
+            
+        except Exception as e:
+            logger.error(f"Failed to extract text from PDF: {e}")
+            raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+        
+        yield from accumulator.flush()
+
+    def _iter_page_texts(self, source: Union[str, bytes], filename: Optional[str]) -> Iterator[str]:
+        """
+        Yield the text of each page in order, OCR'ing pages without a text layer.
+        
+        Ranges of at least PDF_PARALLEL_MIN_PAGES pages are split into one
+        contiguous range per worker process, and each worker reopens the PDF
+        from source (pass a file path to avoid sending the bytes). PyMuPDF is
+        not thread-safe and keeps the GIL while extracting, so threads over one
+        document would not help. Smaller PDFs are read in this process, one page
+        per _fitz_lock acquisition, with OCR outside the lock.
+        
+        Args:
+            source: Path of the PDF on disk (MuPDF reads objects on demand), or the PDF bytes
+            filename: Optional filename (for logging)
+            
+        Yields:
+            Text of each page, in page order
+        """
+        with _fitz_lock:
+            doc = _open_pdf(source)
+            page_count = len(doc)
+        
+        try:
+            if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS <= 1:
+                for page_num in range(page_count):
+                    with _fitz_lock:
+                        text, scan = _read_page(doc, page_num)
+                    if scan is not None:
+                        logger.debug(f"PDF {filename or 'unknown'} page {page_num} has no text layer, running OCR")
+                        text = self._image_extractor.recognize_images([scan])[0]
+                    yield text
+                return
+        finally:
+            with _fitz_lock:
+                doc.close()
+        
+        pages_per_worker = -(-page_count // PDF_WORKERS)
+        pool = _get_page_pool()
+        futures = [
+            pool.submit(_extract_page_range, source, range_start, min(range_start + pages_per_worker, page_count))
+            for range_start in range(0, page_count, pages_per_worker)
+        ]
+        try:
+            for future in futures:
+                yield from future.result()
+        except BrokenProcessPool:
+            _reset_page_pool()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
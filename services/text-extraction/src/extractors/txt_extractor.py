@@ -6,23 +6,36 @@ Extracts text from plain text files.
 
 import logging
 from typing import Optional
+from charset_normalizer import from_bytes
 
 from ..interfaces.text_extraction_service import TextExtractionService
 
 logger = logging.getLogger(__name__)
 
+# Bytes sampled to detect the encoding of non-UTF-8 files
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
 
 class TXTExtractor(TextExtractionService):
     """Plain text file extraction."""
 
+    SUPPORTED_FORMATS = frozenset({'text/plain'})
+    SUPPORTED_EXTENSIONS = ('.txt',)
+
     def supports_format(self, content_type: str, filename: Optional[str] = None) -> bool:
         """Check if file is a plain text file."""
         return (
-            content_type == 'text/plain' or
-            (filename and filename.lower().endswith('.txt'))
+            content_type.lower() in self.SUPPORTED_FORMATS or
+            (filename and filename.lower().endswith(self.SUPPORTED_EXTENSIONS))
         )
 
-    def extract_text(self, file_data: bytes, content_type: str, filename: Optional[str] = None) -> str:
+    def extract_text(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> str:
         """
         Extract text from plain text file.
         
@@ -30,6 +43,7 @@ class TXTExtractor(TextExtractionService):
             file_data: Text file data as bytes
             content_type: MIME type (should be "text/plain")
             filename: Optional filename
+            file_path: Optional path of the file on disk (unused)
             
         Returns:
             Text content
@@ -43,17 +57,16 @@ class TXTExtractor(TextExtractionService):
         try:
             # Try UTF-8 first
             try:
-                text = file_data.decode('utf-8')
+                return file_data.decode('utf-8')
             except UnicodeDecodeError:
-                # Fall back to latin-1 (covers most cases)
-                try:
-                    text = file_data.decode('latin-1')
-                except UnicodeDecodeError:
-                    # Last resort: ignore errors
-                    text = file_data.decode('utf-8', errors='ignore')
-                    logger.warning(f"Text file {filename or 'unknown'} had encoding issues, some characters may be lost")
+                pass
+            
+            # Detect the encoding from a sample, then decode once (latin-1 if undetected)
+            match = from_bytes(file_data[:ENCODING_SAMPLE_SIZE]).best()
+            encoding = match.encoding if match else 'latin-1'
+            logger.info(f"Text file {filename or 'unknown'} is not UTF-8, decoding as {encoding}")
             
-            return text
+            return file_data.decode(encoding, errors='replace')
             
         except Exception as e:
             logger.error(f"Failed to extract text from TXT file: {e}")
@@ -4,7 +4,11 @@ Text Extraction Factory
 Creates text extraction service instances based on file format.
 """
 
-from typing import Optional
+import multiprocessing
+import os
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from ..interfaces.text_extraction_service import TextExtractionService
 from ..extractors.pdf_extractor import PDFExtractor
 from ..extractors.docx_extractor import DOCXExtractor
@@ -12,6 +16,17 @@ from ..extractors.doc_extractor import DOCExtractor
 from ..extractors.image_extractor import ImageExtractor
 from ..extractors.txt_extractor import TXTExtractor
 
+# Factory of the current batch worker process (created on first use)
+_worker_factory: Optional['TextExtractionFactory'] = None
+
+
+def _extract_in_worker(file_data: bytes, content_type: str, filename: Optional[str]) -> str:
+    """Extract text in a batch worker process with that process's own extractors."""
+    global _worker_factory
+    if _worker_factory is None:
+        _worker_factory = TextExtractionFactory()
+    return _worker_factory.extract_text(file_data, content_type, filename)
+
 
 class TextExtractionFactory:
     """
@@ -22,13 +37,30 @@ class TextExtractionFactory:
 
     def __init__(self):
         """Initialize factory with all available extractors."""
+        # One OCR engine for images and scanned PDF pages (warmed up once)
+        image_extractor = ImageExtractor()
         self.extractors = [
-            PDFExtractor(),
+            PDFExtractor(image_extractor),
             DOCXExtractor(),
             DOCExtractor(),
-            ImageExtractor(),
+            image_extractor,
             TXTExtractor(),
         ]
+        
+        # Extractor index per MIME type and extension; earlier extractors take
+        # precedence, as they would in a linear supports_format scan
+        self._by_content_type: Dict[str, int] = {}
+        self._by_extension: Dict[str, int] = {}
+        for index, extractor in enumerate(self.extractors):
+            for content_type in extractor.SUPPORTED_FORMATS:
+                self._by_content_type.setdefault(content_type, index)
+            for extension in extractor.SUPPORTED_EXTENSIONS:
+                self._by_extension.setdefault(extension, index)
+
+    def warm_up(self) -> None:
+        """Warm up all extractors (e.g. load OCR language data) before the first request."""
+        for extractor in self.extractors:
+            extractor.warm_up()
 
     def get_extractor(self, content_type: str, filename: Optional[str] = None) -> TextExtractionService:
         """
@@ -44,13 +76,25 @@ class TextExtractionFactory:
         Raises:
             ValueError: If no extractor supports the format
         """
-        for extractor in self.extractors:
-            if extractor.supports_format(content_type, filename):
-                return extractor
+        matches = [self._by_content_type.get((content_type or '').lower())]
+        if filename:
+            name, dot, extension = filename.lower().rpartition('.')
+            if dot:
+                matches.append(self._by_extension.get(dot + extension))
+        
+        indices = [index for index in matches if index is not None]
+        if indices:
+            return self.extractors[min(indices)]
         
         raise ValueError(f"No extractor available for format: {content_type}")
 
-    def extract_text(self, file_data: bytes, content_type: str, filename: Optional[str] = None) -> str:
+    def extract_text(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> str:
         """
         Extract text from file using appropriate extractor.
         
@@ -58,6 +102,7 @@ class TextExtractionFactory:
             file_data: File data as bytes
             content_type: MIME type of the file
             filename: Optional filename
+            file_path: Optional path of the file on disk, for extractors that can read it directly
             
         Returns:
             Extracted text
@@ -66,4 +111,92 @@ class TextExtractionFactory:
             ValueError: If format is unsupported or extraction fails
         """
         extractor = self.get_extractor(content_type, filename)
-        return extractor.extract_text(file_data, content_type, filename)
+        return extractor.extract_text(file_data, content_type, filename, file_path)
+
+    def extract_chunks(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None,
+        chunk_size: int = 800,
+        chunk_overlap: int = 200,
+        preserve_sentences: bool = True,
+        preserve_paragraphs: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Extract text from file using appropriate extractor and yield it as chunks.
+        
+        Args:
+            file_data: File data as bytes
+            content_type: MIME type of the file
+            filename: Optional filename
+            file_path: Optional path of the file on disk, for extractors that can read it directly
+            chunk_size: Target chunk size in tokens
+            chunk_overlap: Overlap between chunks in tokens
+            preserve_sentences: Try to preserve sentence boundaries
+            preserve_paragraphs: Try to preserve paragraph boundaries
+            
+        Yields:
+            Chunk dictionaries with 'content', 'index', and 'metadata'
+            
+        Raises:
+            ValueError: If format is unsupported or extraction fails
+        """
+        extractor = self.get_extractor(content_type, filename)
+        yield from extractor.extract_chunks(
+            file_data,
+            content_type,
+            filename,
+            file_path,
+            chunk_size,
+            chunk_overlap,
+            preserve_sentences,
+            preserve_paragraphs
+        )
+
+    def extract_text_batch(
+        self,
+        files: List[Tuple[bytes, str, Optional[str]]],
+        max_workers: int = min(os.cpu_count() or 1, 4)
+    ) -> List[str]:
+        """
+        Extract text from several files in parallel worker processes.
+        
+        Args:
+            files: List of (file_data, content_type, filename) tuples
+            max_workers: Maximum number of worker processes
+            
+        Returns:
+            Extracted text for each file, in input order
+            
+        Raises:
+            ValueError: If any file's format is unsupported or extraction fails
+        """
+        if len(files) <= 1 or max_workers <= 1:
+            return [self.extract_text(*file) for file in files]
+        
+        # forkserver, not fork: forking this multithreaded process without exec
+        # could deadlock the workers
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(files)),
+            mp_context=multiprocessing.get_context('forkserver')
+        ) as executor:
+            return list(executor.map(_extract_in_worker, *zip(*files)))
+
+
+@lru_cache(maxsize=1)
+def get_factory() -> TextExtractionFactory:
+    """
+    Get the process-wide factory (created on first use).
+    
+    Prefer this to constructing TextExtractionFactory, so extractors (and the
+    Tesseract language data they load) are set up once per process. The shared
+    instance is safe to use from several threads: extractors keep no
+    per-request state, and the OCR extractor serializes its Tesseract API
+    behind a lock.
+    
+    Returns:
+        Shared TextExtractionFactory instance
+    """
+    return TextExtractionFactory()
@@ -4,9 +4,11 @@ TextExtractionService Interface
 Provider-agnostic interface for text extraction services.
 """
 
-from typing import Optional
+from typing import Any, Dict, FrozenSet, Iterator, Optional, Tuple
 from abc import ABC, abstractmethod
 
+from ..utils.chunking import ChunkAccumulator
+
 
 class TextExtractionService(ABC):
     """
@@ -15,8 +17,19 @@ class TextExtractionService(ABC):
     All text extraction providers must implement this interface.
     """
 
+    # MIME types and lowercase filename extensions the service handles
+    # (used by the factory to dispatch without calling supports_format)
+    SUPPORTED_FORMATS: FrozenSet[str] = frozenset()
+    SUPPORTED_EXTENSIONS: Tuple[str, ...] = ()
+
     @abstractmethod
-    def extract_text(self, file_data: bytes, content_type: str, filename: Optional[str] = None) -> str:
+    def extract_text(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> str:
         """
         Extract text from a file.
         
@@ -24,6 +37,8 @@ class TextExtractionService(ABC):
             file_data: File data as bytes
             content_type: MIME type of the file (e.g., "application/pdf", "image/png")
             filename: Optional filename (useful for format detection)
+            file_path: Optional path of the same file on disk; extractors that can
+                read from disk may use it instead of file_data
             
         Returns:
             Extracted text as string
@@ -34,6 +49,53 @@ class TextExtractionService(ABC):
         """
         pass
 
+    def extract_chunks(
+        self,
+        file_data: bytes,
+        content_type: str,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None,
+        chunk_size: int = 800,
+        chunk_overlap: int = 200,
+        preserve_sentences: bool = True,
+        preserve_paragraphs: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Extract text from a file and yield it as chunks.
+        
+        Chunks are the same as chunk_text on the extract_text result. This
+        default extracts the full text first; extractors that read a file
+        piece by piece override it to chunk while extracting.
+        
+        Args:
+            file_data: File data as bytes
+            content_type: MIME type of the file
+            filename: Optional filename
+            file_path: Optional path of the same file on disk
+            chunk_size: Target chunk size in tokens
+            chunk_overlap: Overlap between chunks in tokens
+            preserve_sentences: Try to preserve sentence boundaries
+            preserve_paragraphs: Try to preserve paragraph boundaries
+            
+        Yields:
+            Chunk dictionaries with 'content', 'index', and 'metadata'
+            
+        Raises:
+            ValueError: If file format is unsupported
+            Exception: If extraction fails
+        """
+        accumulator = ChunkAccumulator(chunk_size, chunk_overlap, preserve_sentences, preserve_paragraphs)
+        accumulator.add_text(self.extract_text(file_data, content_type, filename, file_path))
+        yield from accumulator.flush()
+
+    def warm_up(self) -> None:
+        """
+        Load expensive state (models, language data) ahead of the first request.
+        
+        Extractors without such state keep this no-op default.
+        """
+        pass
+
     @abstractmethod
     def supports_format(self, content_type: str, filename: Optional[str] = None) -> bool:
         """
@@ -5,7 +5,13 @@ Chunks text into segments for embedding generation.
 """
 
 import re
-from typing import List, Dict, Any
+from collections import deque
+from typing import Deque, Iterable, List, Dict, Any
+
+# A sentence runs up to the first [.!?] followed by whitespace (or to the end);
+# written as an unrolled loop over non-terminators so no lazy backtracking is needed
+_SENTENCE_RE = re.compile(r'[^.!?]*(?:[.!?](?!\s)[^.!?]*)*[.!?]\s+|.+', re.DOTALL)
+_SENTENCE_END_RE = re.compile(r'[.!?]\s+$')
 
 
 def estimate_tokens(text: str) -> int:
@@ -24,99 +30,214 @@ def estimate_tokens(text: str) -> int:
     return len(text) // 4
 
 
-def chunk_text(
-    text: str,
-    chunk_size: int = 800,
-    chunk_overlap: int = 200,
-    preserve_sentences: bool = True,
-    preserve_paragraphs: bool = False
-) -> List[Dict[str, Any]]:
+class ChunkAccumulator:
     """
-    Chunk text into segments for embedding generation.
+    Incremental chunker: text is added piece by piece (e.g. one PDF page at a
+    time) and finished chunks can be drained before the whole document is read.
     
-    Args:
-        text: Text to chunk
-        chunk_size: Target chunk size in tokens
-        chunk_overlap: Overlap between chunks in tokens
-        preserve_sentences: Try to preserve sentence boundaries
-        preserve_paragraphs: Try to preserve paragraph boundaries
-        
-    Returns:
-        List of chunk dictionaries with 'content', 'index', and 'metadata'
+    Pieces are treated as if joined with '\n\n' (empty pieces included, as
+    in str.join), so feeding a document in pieces yields the same chunks as
+    chunk_text on the joined text.
     """
-    if not text.strip():
-        return []
-    
-    # Split by paragraphs first if preserve_paragraphs is True
-    if preserve_paragraphs:
-        paragraphs = text.split('\n\n')
-    else:
-        paragraphs = [text]
-    
-    chunks = []
-    chunk_index = 0
-    current_chunk = ""
-    
-    for paragraph in paragraphs:
+
+    def __init__(
+        self,
+        chunk_size: int = 800,
+        chunk_overlap: int = 200,
+        preserve_sentences: bool = True,
+        preserve_paragraphs: bool = False
+    ):
+        """
+        Initialize accumulator.
+        
+        Args:
+            chunk_size: Target chunk size in tokens
+            chunk_overlap: Overlap between chunks in tokens
+            preserve_sentences: Try to preserve sentence boundaries
+            preserve_paragraphs: Try to preserve paragraph boundaries
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.preserve_sentences = preserve_sentences
+        self.preserve_paragraphs = preserve_paragraphs
+        
+        self._chunks: List[Dict[str, Any]] = []
+        self._chunk_index = 0
+        
+        # Current chunk as its '\n\n'-joined sentences, their lengths and a running
+        # character count, so it is joined once per chunk instead of re-measured
+        # per sentence. Parts never have surrounding whitespace, so the joined
+        # chunk needs no strip. Overlap is taken by dropping sentences from the left.
+        self._parts: Deque[str] = deque()
+        self._part_lengths: Deque[int] = deque()
+        self._length = 0
+        
+        # Trailing text that may continue in the next piece (the unfinished
+        # sentence, or all text when sentences and paragraphs are not preserved)
+        self._pending = ''
+        
+        # Whether a piece was added yet (every later piece is preceded by '\n\n')
+        self._started = False
+
+    def add_text(self, text: str) -> None:
+        """
+        Add the next piece of the document.
+        
+        Args:
+            text: Text piece
+        """
+        # Paragraph mode: piece boundaries are paragraph boundaries
+        if self.preserve_paragraphs:
+            for paragraph in text.split('\n\n'):
+                self._add_paragraph(paragraph)
+            return
+        
+        # Otherwise the document is one paragraph whose last sentence may continue;
+        # the separator is kept even around empty pieces, so '\n\n' runs (which
+        # survive inside a chunk when sentences are not preserved) match the join
+        text = self._pending + '\n\n' + text if self._started else text
+        self._started = True
+        if not self.preserve_sentences:
+            self._pending = text
+            return
+        
+        # The last sentence is kept pending unless it ends at a sentence boundary
+        sentences = _SENTENCE_RE.findall(text)
+        if sentences and not _SENTENCE_END_RE.search(sentences[-1]):
+            self._pending = sentences.pop()
+        else:
+            self._pending = ''
+        self._add_sentences(sentences)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """
+        Take the chunks completed so far.
+        
+        Returns:
+            Completed chunk dictionaries not returned before
+        """
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Finish the document: chunk any pending text and close the last chunk.
+        
+        Returns:
+            Remaining chunk dictionaries not returned before
+        """
+        if self._pending:
+            if self.preserve_sentences:
+                self._add_sentences([self._pending])
+            else:
+                self._add_paragraph(self._pending)
+            self._pending = ''
+        
+        # Add final chunk if there's remaining text
+        if self._parts:
+            self._emit()
+            self._parts.clear()
+            self._part_lengths.clear()
+            self._length = 0
+        
+        return self.drain()
+
+    def _add_paragraph(self, paragraph: str) -> None:
+        """Chunk a complete paragraph."""
         paragraph = paragraph.strip()
         if not paragraph:
-            continue
+            return
         
         # If preserving sentences, split by sentence boundaries
-        if preserve_sentences:
+        if self.preserve_sentences:
             # Simple sentence splitting (period, exclamation, question mark followed by space)
-            sentences = re.split(r'([.!?]\s+)', paragraph)
-            # Rejoin sentences with their punctuation
-            sentences = [sentences[i] + (sentences[i+1] if i+1 < len(sentences) else '') 
-                        for i in range(0, len(sentences), 2)]
+            self._add_sentences(_SENTENCE_RE.findall(paragraph))
         else:
-            sentences = [paragraph]
+            self._add_sentences([paragraph])
+
+    def _add_sentences(self, sentences: Iterable[str]) -> None:
+        """Add sentences to the current chunk, starting a new chunk whenever it is full."""
+        # Hot loop over every sentence of the document: the state lives in locals
+        # and token counts are compared as len // 4 (estimate_tokens) inline
+        parts = self._parts
+        part_lengths = self._part_lengths
+        length = self._length
+        chunk_size = self.chunk_size
         
         for sentence in sentences:
             sentence = sentence.strip()
             if not sentence:
                 continue
-            
-            sentence_tokens = estimate_tokens(sentence)
-            current_tokens = estimate_tokens(current_chunk)
+            sentence_length = len(sentence)
             
             # If adding this sentence would exceed chunk size
-            if current_tokens + sentence_tokens > chunk_size and current_chunk:
+            if length // 4 + sentence_length // 4 > chunk_size and parts:
                 # Save current chunk
-                chunks.append({
-                    'content': current_chunk.strip(),
-                    'index': chunk_index,
-                    'metadata': {
-                        'token_count': current_tokens,
-                        'char_count': len(current_chunk),
-                    }
-                })
-                chunk_index += 1
+                self._length = length
+                self._emit()
                 
-                # Start new chunk with overlap
-                if chunk_overlap > 0 and chunks:
-                    # Get last chunk and use its end as overlap
-                    last_chunk = chunks[-1]['content']
-                    overlap_text = last_chunk[-chunk_overlap * 4:]  # Approximate overlap in chars
-                    current_chunk = overlap_text + '\n\n' + sentence
-                else:
-                    current_chunk = sentence
-            else:
-                # Add sentence to current chunk
-                if current_chunk:
-                    current_chunk += '\n\n' + sentence
+                # Start new chunk with overlap: the trailing sentences of the saved
+                # chunk covering at least chunk_overlap tokens (its first sentence is
+                # always dropped, so a chunk is never carried over whole)
+                if self.chunk_overlap > 0:
+                    self._drop_first_part()
+                    while parts and self._length - part_lengths[0] - 2 >= self.chunk_overlap * 4:
+                        self._drop_first_part()
+                    length = self._length
                 else:
-                    current_chunk = sentence
-    
-    # Add final chunk if there's remaining text
-    if current_chunk.strip():
-        chunks.append({
-            'content': current_chunk.strip(),
-            'index': chunk_index,
+                    parts.clear()
+                    part_lengths.clear()
+                    length = 0
+            
+            # Add sentence to current chunk
+            if parts:
+                length += 2
+            parts.append(sentence)
+            part_lengths.append(sentence_length)
+            length += sentence_length
+        
+        self._length = length
+
+    def _drop_first_part(self) -> None:
+        """Remove the first sentence (and its separator) from the current chunk."""
+        self._parts.popleft()
+        self._length -= self._part_lengths.popleft()
+        if self._parts:
+            self._length -= 2
+
+    def _emit(self) -> None:
+        """Append the current chunk to the completed chunks."""
+        self._chunks.append({
+            'content': '\n\n'.join(self._parts),
+            'index': self._chunk_index,
             'metadata': {
-                'token_count': estimate_tokens(current_chunk),
-                'char_count': len(current_chunk),
+                'token_count': self._length // 4,
+                'char_count': self._length,
             }
         })
+        self._chunk_index += 1
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = 800,
+    chunk_overlap: int = 200,
+    preserve_sentences: bool = True,
+    preserve_paragraphs: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Chunk text into segments for embedding generation.
     
-    return chunks
+    Args:
+        text: Text to chunk
+        chunk_size: Target chunk size in tokens
+        chunk_overlap: Overlap between chunks in tokens
+        preserve_sentences: Try to preserve sentence boundaries
+        preserve_paragraphs: Try to preserve paragraph boundaries
+        
+    Returns:
+        List of chunk dictionaries with 'content', 'index', and 'metadata'
+    """
+    accumulator = ChunkAccumulator(chunk_size, chunk_overlap, preserve_sentences, preserve_paragraphs)
+    accumulator.add_text(text)
+    return accumulator.flush()
@@ -0,0 +1,108 @@
+"""
+Tests for incremental chunking (ChunkAccumulator) against chunk_text.
+
+Run from services/text-extraction with: python -m pytest tests
+"""
+
+import random
+
+import fitz  # PyMuPDF
+import pytest
+
+from src.extractors import pdf_extractor
+from src.extractors.pdf_extractor import PDFExtractor
+from src.utils.chunking import ChunkAccumulator, chunk_text
+
+# Fragments pages are built from: sentence ends, abbreviations, whitespace-only
+# and empty text, and words longer than a chunk
+FRAGMENTS = [
+    '', ' ', '\n', '\n\n', 'Hello world.', 'Foo bar', '! ', '? ', '. ',
+    'x' * 30, 'e.g. this', 'end.\n', 'A.', '\n\nPara', ' .',
+]
+
+CHUNK_MODES = [
+    (True, False),
+    (True, True),
+    (False, False),
+    (False, True),
+]
+
+
+def _chunk_pieces(pieces, chunk_size, chunk_overlap, preserve_sentences, preserve_paragraphs):
+    """Chunk pieces with a ChunkAccumulator, draining after every piece."""
+    accumulator = ChunkAccumulator(chunk_size, chunk_overlap, preserve_sentences, preserve_paragraphs)
+    chunks = []
+    for piece in pieces:
+        accumulator.add_text(piece)
+        chunks.extend(accumulator.drain())
+    chunks.extend(accumulator.flush())
+    return chunks
+
+
+@pytest.mark.parametrize('preserve_sentences, preserve_paragraphs', CHUNK_MODES)
+def test_pieces_chunk_like_joined_text(preserve_sentences, preserve_paragraphs):
+    rng = random.Random(0)
+    for _ in range(2000):
+        pieces = [
+            ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 6)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        chunk_size = rng.randint(1, 12)
+        chunk_overlap = rng.randint(0, 5)
+        
+        expected = chunk_text('\n\n'.join(pieces), chunk_size, chunk_overlap, preserve_sentences, preserve_paragraphs)
+        actual = _chunk_pieces(pieces, chunk_size, chunk_overlap, preserve_sentences, preserve_paragraphs)
+        assert actual == expected, pieces
+
+
+@pytest.mark.parametrize('preserve_sentences, preserve_paragraphs', CHUNK_MODES)
+def test_empty_pieces_keep_separator(preserve_sentences, preserve_paragraphs):
+    pieces = ['First page', '', 'third page', '', '', 'last page.']
+    
+    expected = chunk_text('\n\n'.join(pieces), 800, 200, preserve_sentences, preserve_paragraphs)
+    actual = _chunk_pieces(pieces, 800, 200, preserve_sentences, preserve_paragraphs)
+    assert actual == expected
+
+
+def test_overlap_repeats_trailing_sentences():
+    text = ' '.join(f'Sentence number {number} is here.' for number in range(40))
+    
+    chunks = chunk_text(text, chunk_size=50, chunk_overlap=10)
+    
+    assert len(chunks) > 1
+    assert [chunk['index'] for chunk in chunks] == list(range(len(chunks)))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        first_sentence = chunk['content'].split('\n\n')[0]
+        assert first_sentence in previous['content']
+        assert chunk['metadata']['char_count'] == len(chunk['content'])
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+@pytest.mark.parametrize('preserve_sentences, preserve_paragraphs', CHUNK_MODES)
+def test_pdf_chunks_match_extracted_text(monkeypatch, parallel, preserve_sentences, preserve_paragraphs):
+    monkeypatch.setattr(pdf_extractor, 'PDF_PARALLEL_MIN_PAGES', 2 if parallel else 1000)
+    monkeypatch.setattr(pdf_extractor, 'PDF_WORKERS', 2 if parallel else 1)
+    
+    # Blank pages have no text layer and no content, so they are neither OCR'd nor joined
+    page_texts = ['Page one. It ends mid', '', 'sentence here. Then more text', '', 'Final page.']
+    doc = fitz.open()
+    for page_text in page_texts:
+        page = doc.new_page()
+        if page_text:
+            page.insert_text((72, 72), page_text)
+    file_data = doc.tobytes()
+    doc.close()
+    
+    extractor = PDFExtractor()
+    text = extractor.extract_text(file_data, 'application/pdf', 'test.pdf')
+    chunks = list(extractor.extract_chunks(
+        file_data,
+        'application/pdf',
+        'test.pdf',
+        chunk_size=8,
+        chunk_overlap=2,
+        preserve_sentences=preserve_sentences,
+        preserve_paragraphs=preserve_paragraphs
+    ))
+    
+    assert chunks == chunk_text(text, 8, 2, preserve_sentences, preserve_paragraphs)
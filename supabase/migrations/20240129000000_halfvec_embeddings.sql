@@ -0,0 +1,76 @@
+-- Half-Precision Embeddings Migration
+-- 
+-- Stores document chunk embeddings as halfvec(1536) (FP16) instead of vector(1536) (FP32).
+-- This halves row size (6 KB -> 3 KB), the payload of every embedding update and the
+-- HNSW index memory, with negligible recall impact for text-embedding-3-small.
+-- Requires pgvector >= 0.7.0.
+
+-- ============================================================================
+-- DOCUMENT_CHUNKS EMBEDDING COLUMN
+-- ============================================================================
+
+-- The HNSW index is bound to vector_cosine_ops, so drop it before changing the type
+DROP INDEX IF EXISTS idx_document_chunks_embedding;
+
+ALTER TABLE document_chunks
+  ALTER COLUMN embedding TYPE halfvec(1536)
+  USING embedding::halfvec(1536);
+
+-- Recreate the HNSW index with the halfvec operator class
+CREATE INDEX idx_document_chunks_embedding
+  ON document_chunks USING hnsw (embedding halfvec_cosine_ops);
+
+-- ============================================================================
+-- VECTOR SEARCH FUNCTION
+-- ============================================================================
+
+-- Keep the vector(1536) signature so callers are unchanged; the query embedding is
+-- cast to halfvec once so the HNSW index can be used for the ORDER BY.
+CREATE OR REPLACE FUNCTION search_similar_chunks(
+  query_embedding vector(1536),
+  p_app_id uuid,
+  p_top_k integer DEFAULT 5,
+  p_similarity_threshold float DEFAULT 0.0,
+  p_email_id uuid DEFAULT NULL,
+  p_attachment_id uuid DEFAULT NULL
+)
+RETURNS TABLE (
+  chunk_id uuid,
+  content text,
+  similarity float,
+  chunk_index integer,
+  email_id uuid,
+  attachment_id uuid,
+  metadata jsonb
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  query_half halfvec(1536) := query_embedding::halfvec(1536);
+BEGIN
+  RETURN QUERY
+  SELECT
+    dc.id AS chunk_id,
+    dc.content,
+    1 - (dc.embedding <=> query_half) AS similarity,
+    dc.chunk_index,
+    dc.email_id,
+    dc.attachment_id,
+    dc.metadata
+  FROM document_chunks dc
+  WHERE
+    dc.app_id = p_app_id
+    AND dc.status = 'completed'
+    AND dc.embedding IS NOT NULL
+    AND (p_email_id IS NULL OR dc.email_id = p_email_id)
+    AND (p_attachment_id IS NULL OR dc.attachment_id = p_attachment_id)
+    AND (1 - (dc.embedding <=> query_half)) >= p_similarity_threshold
+  ORDER BY dc.embedding <=> query_half
+  LIMIT p_top_k;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_similar_chunks TO authenticated;
+GRANT EXECUTE ON FUNCTION search_similar_chunks TO service_role;
+
+ANALYZE document_chunks;
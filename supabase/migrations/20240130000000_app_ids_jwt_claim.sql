@@ -0,0 +1,62 @@
+-- App Membership JWT Claim Migration
+-- 
+-- Mirrors each user's app memberships into auth.users.raw_app_meta_data.app_ids so that
+-- Supabase includes them in the JWT (app_metadata.app_ids). The query API can then check
+-- membership from the already-verified token instead of querying app_members per request.
+-- Tokens pick up membership changes on their next refresh.
+
+-- ============================================================================
+-- FUNCTIONS AND TRIGGERS
+-- ============================================================================
+
+-- Function to rewrite the app_ids claim for one user from app_members
+CREATE OR REPLACE FUNCTION sync_user_app_ids(p_user_id uuid)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE auth.users
+  SET raw_app_meta_data = COALESCE(raw_app_meta_data, '{}'::jsonb) || jsonb_build_object(
+    'app_ids',
+    COALESCE(
+      (SELECT jsonb_agg(am.app_id ORDER BY am.app_id) FROM app_members am WHERE am.user_id = p_user_id),
+      '[]'::jsonb
+    )
+  )
+  WHERE id = p_user_id;
+END;
+$$;
+
+-- Trigger function keeping the claim in sync with app_members changes
+CREATE OR REPLACE FUNCTION sync_app_ids_on_membership_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM sync_user_app_ids(OLD.user_id);
+    RETURN NULL;
+  END IF;
+
+  PERFORM sync_user_app_ids(NEW.user_id);
+  IF TG_OP = 'UPDATE' AND OLD.user_id <> NEW.user_id THEN
+    PERFORM sync_user_app_ids(OLD.user_id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER sync_app_members_app_ids
+  AFTER INSERT OR UPDATE OF app_id, user_id OR DELETE ON app_members
+  FOR EACH ROW
+  EXECUTE FUNCTION sync_app_ids_on_membership_change();
+
+-- ============================================================================
+-- BACKFILL
+-- ============================================================================
+
+SELECT sync_user_app_ids(u.id) FROM auth.users u;
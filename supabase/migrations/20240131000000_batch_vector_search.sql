@@ -0,0 +1,62 @@
+-- Batch Vector Search Function
+-- 
+-- Searches several query embeddings in one call (one round-trip) instead of one
+-- search_similar_chunks RPC per embedding. Each query embedding gets its own
+-- top-k via a LATERAL subquery, so every lookup can still use the HNSW index.
+
+CREATE OR REPLACE FUNCTION search_similar_chunks_batch(
+  query_embeddings vector(1536)[],
+  p_app_id uuid,
+  p_top_k integer DEFAULT 5,
+  p_similarity_threshold float DEFAULT 0.0,
+  p_email_id uuid DEFAULT NULL,
+  p_attachment_id uuid DEFAULT NULL
+)
+RETURNS TABLE (
+  query_index integer,
+  chunk_id uuid,
+  content text,
+  similarity float,
+  chunk_index integer,
+  email_id uuid,
+  attachment_id uuid,
+  metadata jsonb
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    (q.idx - 1)::integer AS query_index,  -- 0-based position in query_embeddings
+    r.chunk_id,
+    r.content,
+    r.similarity,
+    r.chunk_index,
+    r.email_id,
+    r.attachment_id,
+    r.metadata
+  FROM unnest(query_embeddings) WITH ORDINALITY AS q(embedding, idx)
+  CROSS JOIN LATERAL (
+    SELECT
+      dc.id AS chunk_id,
+      dc.content,
+      1 - (dc.embedding <=> q.embedding::halfvec(1536)) AS similarity,
+      dc.chunk_index,
+      dc.email_id,
+      dc.attachment_id,
+      dc.metadata
+    FROM document_chunks dc
+    WHERE
+      dc.app_id = p_app_id
+      AND dc.status = 'completed'
+      AND dc.embedding IS NOT NULL
+      AND (p_email_id IS NULL OR dc.email_id = p_email_id)
+      AND (p_attachment_id IS NULL OR dc.attachment_id = p_attachment_id)
+      AND (1 - (dc.embedding <=> q.embedding::halfvec(1536))) >= p_similarity_threshold
+    ORDER BY dc.embedding <=> q.embedding::halfvec(1536)
+    LIMIT p_top_k
+  ) r
+  ORDER BY q.idx, r.similarity DESC;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_similar_chunks_batch TO authenticated;
+GRANT EXECUTE ON FUNCTION search_similar_chunks_batch TO service_role;
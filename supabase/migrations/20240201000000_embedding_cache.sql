@@ -0,0 +1,21 @@
+-- Embedding Cache Migration
+-- 
+-- Stores embeddings keyed by the SHA-256 of the embedded text and the model, so
+-- identical content (re-uploaded documents, reprocessed attachments) is not sent
+-- to the embedding API again. Written by the embedding-generation function and
+-- read by text-extraction when storing new chunks.
+
+-- ============================================================================
+-- EMBEDDING_CACHE TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS embedding_cache (
+  content_sha256 TEXT NOT NULL,  -- Hex SHA-256 of the UTF-8 chunk content
+  model TEXT NOT NULL,
+  embedding halfvec(1536) NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (content_sha256, model)
+);
+
+-- Only the service role (Cloud Functions) reads or writes the cache
+ALTER TABLE embedding_cache ENABLE ROW LEVEL SECURITY;